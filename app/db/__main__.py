@@ -0,0 +1,14 @@
+"""
+スキーマ作成・マイグレーションを明示的に実行する。
+
+    python -m app.db
+
+起動時の init_db を APP_SKIP_DB_INIT=1 で省略している場合、デプロイ時などにこのコマンドで適用する。
+"""
+import app.models.tables  # noqa: F401  全モデルを Base.metadata に登録する
+from app.db.session import init_db
+
+
+if __name__ == "__main__":
+    init_db(force=True)
+    print("DB スキーマを適用しました。")
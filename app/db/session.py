@@ -1,73 +1,269 @@
+import atexit
+import functools
+import os
+import re
 from pathlib import Path
-from typing import Generator
+from typing import Any, Optional
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Connection
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateIndex
+from starlette.requests import Request
 
 from app.db.base import Base
 
-PROJECT_ROOT = Path(__file__).resolve().parents[2]
-DATA_DIR = PROJECT_ROOT / "data"
-DATA_DIR.mkdir(exist_ok=True)
-DB_PATH = DATA_DIR / "purchase.db"
+
+@functools.cache
+def _db_path() -> Path:
+    """DB ファイルのパス。data ディレクトリは無いときだけ作成する（プロセス内で1回だけ評価）。"""
+    data_dir = Path(__file__).resolve().parents[2] / "data"
+    if not data_dir.is_dir():
+        data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir / "purchase.db"
+
+
+def _set_sqlite_pragmas(dbapi_connection: Any, _connection_record: Any) -> None:
+    """物理接続ごとに1回だけ SQLite の PRAGMA を設定する（WAL で commit ごとの fsync を避ける）。"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
+
+@functools.cache
+def get_engine() -> Engine:
+    # リクエストごとに DB ファイルを開き直さないよう、接続はプールして使い回す
+    created = create_engine(
+        f"sqlite:///{_db_path()}",
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=5,
+        max_overflow=10,
+        pool_recycle=3600,
+        future=True,
+    )
+    event.listen(created, "connect", _set_sqlite_pragmas)
+    return created
+
+
+DB_PATH = _db_path()
+DATA_DIR = DB_PATH.parent
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
+engine = get_engine()
+
+# sessionmaker は呼び出しごとに設定をマージするため、引数を固定した partial で Session を直接生成する
+SessionLocal = functools.partial(Session, bind=engine, autoflush=False)
+# 参照のみのエンドポイント用。commit 後の属性再読込（expire_on_commit）を行わない
+ReadOnlySession = functools.partial(Session, bind=engine, autoflush=False, expire_on_commit=False)
+
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    future=True,
+# init_db のマイグレーション内容（_DESIRED_COLUMNS・索引・バックフィル）を変更したら上げる
+APP_MIGRATION_REV = 4
+
+# 旧スキーマ移行時に退避された発注系テーブル（起動時に削除する）
+_LEGACY_TABLE_PREFIXES: tuple[str, ...] = (
+    "purchase_orders_legacy_",
+    "purchase_order_lines_legacy_",
+    "purchase_order_histories_legacy_",
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+_SAFE_IDENTIFIER = re.compile(r"[A-Za-z0-9_]+")
 
+# item_suppliers バックフィルで1回のコミットに含める items.id の幅
+_ITEM_SUPPLIERS_BACKFILL_BATCH = 5000
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
+# 既存DBに後から追加したカラム。init_db でテーブルごとに不足分だけ ALTER TABLE する
+_DESIRED_COLUMNS: dict[str, list[tuple[str, str]]] = {
+    "items": [
+        ("management_type", "VARCHAR(32)"),
+        ("default_order_quantity", "INTEGER NOT NULL DEFAULT 1"),
+        ("unit_price", "INTEGER"),
+        ("account_name", "VARCHAR(128)"),
+        ("expense_item_name", "VARCHAR(128)"),
+    ],
+    "suppliers": [
+        ("mobile_number", "VARCHAR(64)"),
+        ("phone_number", "VARCHAR(64)"),
+        ("email_cc", "VARCHAR(256)"),
+        ("assistant_name", "VARCHAR(128)"),
+        ("assistant_email", "VARCHAR(256)"),
+        ("fax_number", "VARCHAR(64)"),
+        ("notes", "TEXT"),
+    ],
+    "purchase_order_lines": [
+        ("received_quantity", "INTEGER NOT NULL DEFAULT 0"),
+        ("usage_destination", "VARCHAR(256)"),
+    ],
+    "unmanaged_order_requests": [
+        ("requested_department", "VARCHAR(128)"),
+        ("acknowledged_at", "DATETIME"),
+        ("staged_supplier_id", "INTEGER REFERENCES suppliers(id)"),
+        ("staged_at", "DATETIME"),
+    ],
+    "purchase_results": [
+        ("item_name_free", "VARCHAR(512)"),
+    ],
+}
+
+# _table_columns でカラム一覧を取得してよいテーブル
+_INTROSPECTED_TABLES = frozenset(_DESIRED_COLUMNS) | {"purchase_orders"}
+
+# init_db で使う固定 SQL（呼び出しごとに text() を組み立てないようモジュール読込時に1回だけ生成）
+_STMT_LIST_TABLES = text("SELECT name FROM sqlite_master WHERE type='table'")
+# テーブル値関数形式の pragma_table_info はバインド変数を使えるため SQL を組み立てずに済む
+_STMT_TABLE_COLUMNS = text("SELECT name FROM pragma_table_info(:table_name)")
+_STMT_LOAD_MIGRATION_STATE = text("SELECT key, value FROM _migration_state")
+_STMT_CREATE_MIGRATION_STATE = text(
+    "CREATE TABLE IF NOT EXISTS _migration_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+)
+_STMT_SAVE_MIGRATION_STATE = text(
+    "INSERT OR REPLACE INTO _migration_state (key, value) VALUES (:key, :value)"
+)
+_STMT_MAX_ITEM_ID_WITH_SUPPLIER = text(
+    "SELECT COALESCE(MAX(id), 0) FROM items WHERE supplier_id IS NOT NULL"
+)
+_STMT_BACKFILL_ITEM_SUPPLIERS = text(
+    "INSERT OR IGNORE INTO item_suppliers (item_id, supplier_id, unit_price) "
+    "SELECT id, supplier_id, unit_price FROM items "
+    "WHERE supplier_id IS NOT NULL AND id >= :low AND id < :high"
+)
+_STMT_BACKFILL_ASSISTANT_EMAIL = text(
+    "UPDATE suppliers "
+    "SET assistant_email = email_cc "
+    "WHERE (assistant_email IS NULL OR TRIM(assistant_email) = '') "
+    "AND (email_cc IS NOT NULL AND TRIM(email_cc) <> '')"
+)
+_STMT_BACKFILL_RECEIVED_QUANTITY = text(
+    "UPDATE purchase_order_lines "
+    "SET received_quantity = 0 "
+    "WHERE received_quantity IS NULL"
+)
+# 管理外の仕入品は発注点・注文数量を使わないため 0 / 1 にそろえる
+_STMT_NORMALIZE_UNMANAGED_ITEMS = text(
+    "UPDATE items "
+    "SET reorder_point = 0, default_order_quantity = 1 "
+    "WHERE management_type = '管理外'"
+)
+
+
+# リクエスト中に払い出したセッションを ASGI scope の state に積むキー。
+# 応答後に DbSessionCleanupMiddleware（app.main）がまとめて close する
+REQUEST_DB_SESSIONS_KEY = "db_sessions"
+# 参照用セッションはリクエスト内で1つを共有する（認証ミドルウェアのユーザー参照とエンドポイントで使い回す）
+REQUEST_DB_RO_SESSION_KEY = "db_session_ro"
+
+
+def _register_request_session(request: Request, db: Session) -> Session:
+    request.scope.setdefault("state", {}).setdefault(REQUEST_DB_SESSIONS_KEY, []).append(db)
+    return db
+
+
+def get_db(request: Request) -> Session:
+    """リクエスト単位のセッション。ジェネレータ依存の後処理を避け、close はミドルウェアに任せる。"""
+    return _register_request_session(request, SessionLocal())
+
+
+def get_db_ro(request: Request) -> Session:
+    """参照のみのエンドポイント向けのセッション（更新はしない前提）。同一リクエスト内では同じセッションを返す。"""
+    state = request.scope.setdefault("state", {})
+    db = state.get(REQUEST_DB_RO_SESSION_KEY)
+    if db is None:
+        db = _register_request_session(request, ReadOnlySession())
+        state[REQUEST_DB_RO_SESSION_KEY] = db
+    return db
+
+
+def close_request_sessions(state: dict[str, Any]) -> None:
+    state.pop(REQUEST_DB_RO_SESSION_KEY, None)
+    for db in state.pop(REQUEST_DB_SESSIONS_KEY, ()):
         db.close()
 
 
-def _table_exists(conn: Connection, table_name: str) -> bool:
-    row = conn.execute(
-        text("SELECT name FROM sqlite_master WHERE type='table' AND name = :name"),
-        {"name": table_name},
-    ).fetchone()
-    return row is not None
+def _existing_tables(conn: Connection) -> frozenset[str]:
+    """sqlite_master を1回だけ読み、既存テーブル名の集合を返す。"""
+    return frozenset(conn.scalars(_STMT_LIST_TABLES))
 
 
 def _table_columns(conn: Connection, table_name: str) -> list[str]:
-    if not _table_exists(conn, table_name):
-        return []
-    rows = conn.execute(text(f"PRAGMA table_info({table_name})")).fetchall()
-    return [row[1] for row in rows]
+    # 存在しないテーブルの pragma_table_info は空を返すため、sqlite_master の確認は不要
+    if table_name not in _INTROSPECTED_TABLES:
+        raise ValueError(f"unexpected table name: {table_name}")
+    return list(conn.scalars(_STMT_TABLE_COLUMNS, {"table_name": table_name}))
 
 
-def _ensure_column(conn: Connection, table_name: str, column_name: str, ddl: str) -> None:
-    columns = _table_columns(conn, table_name)
-    if column_name in columns:
-        return
-    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}"))
-
-
-def _migrate_legacy_purchase_order_tables(conn: Connection) -> None:
-    legacy_tables = conn.execute(
-        text(
-            "SELECT name FROM sqlite_master "
-            "WHERE type='table' AND ("
-            "name LIKE 'purchase_orders_legacy_%' OR "
-            "name LIKE 'purchase_order_lines_legacy_%' OR "
-            "name LIKE 'purchase_order_histories_legacy_%'"
-            ")"
+def _add_missing_columns(conn: Connection, tables: frozenset[str]) -> set[tuple[str, str]]:
+    """_DESIRED_COLUMNS のうち既存テーブルに無いカラムだけを追加し、追加した (テーブル, カラム) を返す。"""
+    missing: list[tuple[str, str, str]] = []
+    for table_name, columns in _DESIRED_COLUMNS.items():
+        if table_name not in tables:
+            continue
+        existing = set(_table_columns(conn, table_name))
+        missing.extend(
+            (table_name, column_name, ddl) for column_name, ddl in columns if column_name not in existing
         )
-    ).fetchall()
-    for row in legacy_tables:
-        conn.execute(text(f"DROP TABLE IF EXISTS {row[0]}"))
+    if not missing:
+        return set()
+    # 差分をまとめてから DBAPI カーソルで続けて発行する（SQLAlchemy の実行コンテキストを文ごとに作らない）。
+    # executescript は開始済みトランザクションを COMMIT してしまうため使わない
+    cursor = conn.connection.cursor()
+    try:
+        for table_name, column_name, ddl in missing:
+            cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}")
+    finally:
+        cursor.close()
+    return {(table_name, column_name) for table_name, column_name, _ in missing}
 
-    if not _table_exists(conn, "purchase_orders"):
-        return
+
+def _create_missing_indexes(conn: Connection) -> None:
+    """モデルに宣言した索引を既存テーブルにも作成する（create_all はテーブルがあると索引も作らないため）。"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def _current_schema_fingerprint(conn: Connection) -> tuple[int, int]:
+    schema_version = conn.exec_driver_sql("PRAGMA schema_version").scalar() or 0
+    return int(schema_version), APP_MIGRATION_REV
+
+
+def _load_migration_state(conn: Connection) -> Optional[tuple[int, int]]:
+    try:
+        rows = conn.execute(_STMT_LOAD_MIGRATION_STATE)
+        state = {key: value for key, value in rows}
+    except OperationalError:
+        # 初回起動（_migration_state 未作成）
+        return None
+    if "schema_version" not in state or "app_rev" not in state:
+        return None
+    return int(state["schema_version"]), int(state["app_rev"])
+
+
+def _save_migration_state(conn: Connection) -> None:
+    conn.execute(_STMT_CREATE_MIGRATION_STATE)
+    # CREATE TABLE で schema_version が進むため、作成後に読み直して保存する
+    schema_version, app_rev = _current_schema_fingerprint(conn)
+    for key, value in (("schema_version", schema_version), ("app_rev", app_rev)):
+        conn.execute(_STMT_SAVE_MIGRATION_STATE, {"key": key, "value": value})
+
+
+def _migrate_legacy_purchase_order_tables(conn: Connection) -> frozenset[str]:
+    """旧スキーマの発注系テーブルを削除し、削除後に残っているテーブル名の集合を返す。"""
+    tables = _existing_tables(conn)
+    dropped: set[str] = set()
+    # sqlite_master 由来の名前だが、DDL に埋め込むため識別子として妥当なものだけ扱う
+    for table_name in sorted(tables):
+        if table_name.startswith(_LEGACY_TABLE_PREFIXES) and _SAFE_IDENTIFIER.fullmatch(table_name):
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table_name}")
+            dropped.add(table_name)
+
+    if "purchase_orders" not in tables:
+        return tables - dropped
 
     columns = set(_table_columns(conn, "purchase_orders"))
     required_columns = {"supplier_id", "department", "ordered_by_user", "status", "issued_date"}
@@ -75,69 +271,94 @@ def _migrate_legacy_purchase_order_tables(conn: Connection) -> None:
     is_legacy = bool(columns & legacy_markers) or not required_columns.issubset(columns)
 
     if not is_legacy:
-        return
+        return tables - dropped
 
     for table_name in ("purchase_order_lines", "purchase_order_histories", "purchase_orders"):
-        if _table_exists(conn, table_name):
-            conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+        if table_name in tables:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table_name}")
+            dropped.add(table_name)
+    return tables - dropped
 
 
-def init_db() -> None:
-    with engine.connect() as conn:
-        _migrate_legacy_purchase_order_tables(conn)
-        conn.commit()
+def _backfill_item_suppliers(conn: Connection) -> None:
+    """既存の items.supplier_id + unit_price を item_suppliers に1件ずつ投入する（重複は無視）。
 
-    Base.metadata.create_all(bind=engine)
-
-    with engine.connect() as conn:
-        _ensure_column(conn, "items", "management_type", "VARCHAR(32)")
-        _ensure_column(conn, "items", "default_order_quantity", "INTEGER NOT NULL DEFAULT 1")
-        _ensure_column(conn, "items", "unit_price", "INTEGER")
-        _ensure_column(conn, "items", "account_name", "VARCHAR(128)")
-        _ensure_column(conn, "items", "expense_item_name", "VARCHAR(128)")
-        _ensure_column(conn, "suppliers", "mobile_number", "VARCHAR(64)")
-        _ensure_column(conn, "suppliers", "phone_number", "VARCHAR(64)")
-        _ensure_column(conn, "suppliers", "email_cc", "VARCHAR(256)")
-        _ensure_column(conn, "suppliers", "assistant_name", "VARCHAR(128)")
-        _ensure_column(conn, "suppliers", "assistant_email", "VARCHAR(256)")
-        _ensure_column(conn, "suppliers", "fax_number", "VARCHAR(64)")
-        _ensure_column(conn, "suppliers", "notes", "TEXT")
-        _ensure_column(conn, "purchase_order_lines", "received_quantity", "INTEGER NOT NULL DEFAULT 0")
-        _ensure_column(conn, "purchase_order_lines", "usage_destination", "VARCHAR(256)")
-        _ensure_column(conn, "unmanaged_order_requests", "requested_department", "VARCHAR(128)")
-        _ensure_column(conn, "unmanaged_order_requests", "acknowledged_at", "DATETIME")
-        _ensure_column(conn, "unmanaged_order_requests", "staged_supplier_id", "INTEGER REFERENCES suppliers(id)")
-        _ensure_column(conn, "unmanaged_order_requests", "staged_at", "DATETIME")
-        _ensure_column(conn, "purchase_results", "item_name_free", "VARCHAR(512)")
-        # 既存の items.supplier_id + unit_price を item_suppliers に1件ずつ投入（重複は無視）
-        if _table_exists(conn, "item_suppliers"):
-            conn.execute(
-                text(
-                    "INSERT OR IGNORE INTO item_suppliers (item_id, supplier_id, unit_price) "
-                    "SELECT id, supplier_id, unit_price FROM items WHERE supplier_id IS NOT NULL"
-                )
-            )
+    書き込みロックを長時間保持しないよう、items.id の範囲ごとに分けてコミットする。
+    """
+    max_id = conn.execute(_STMT_MAX_ITEM_ID_WITH_SUPPLIER).scalar() or 0
+    for low in range(0, int(max_id) + 1, _ITEM_SUPPLIERS_BACKFILL_BATCH):
         conn.execute(
-            text(
-                "UPDATE suppliers "
-                "SET assistant_email = email_cc "
-                "WHERE (assistant_email IS NULL OR TRIM(assistant_email) = '') "
-                "AND (email_cc IS NOT NULL AND TRIM(email_cc) <> '')"
-            )
-        )
-        conn.execute(
-            text(
-                "UPDATE purchase_order_lines "
-                "SET received_quantity = 0 "
-                "WHERE received_quantity IS NULL"
-            )
-        )
-        # 管理外の仕入品は発注点・注文数量を使わないため 0 / 1 にそろえる
-        conn.execute(
-            text(
-                "UPDATE items "
-                "SET reorder_point = 0, default_order_quantity = 1 "
-                "WHERE management_type = '管理外'"
-            )
+            _STMT_BACKFILL_ITEM_SUPPLIERS,
+            {"low": low, "high": low + _ITEM_SUPPLIERS_BACKFILL_BATCH},
         )
         conn.commit()
+
+
+_optimize_on_exit_registered = False
+
+
+def _optimize_on_exit() -> None:
+    """プロセス終了時に PRAGMA optimize を実行し、次回起動時のクエリプランナ統計を整える。"""
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA optimize")
+    except Exception:
+        pass
+
+
+def _register_optimize_on_exit() -> None:
+    global _optimize_on_exit_registered
+    if _optimize_on_exit_registered:
+        return
+    atexit.register(_optimize_on_exit)
+    _optimize_on_exit_registered = True
+
+
+def init_db(force: bool = False) -> None:
+    """スキーマ作成・マイグレーションを行う。
+
+    APP_SKIP_DB_INIT=1 のときは起動時の DB アクセスを一切行わない（スキーマ適用は
+    `python -m app.db` で明示的に実行する運用向け）。force=True は前回適用状態に関わらず全体を再適用する。
+    """
+    if not force and _skip_db_init_requested():
+        return
+    _register_optimize_on_exit()
+    if not force:
+        with engine.connect() as conn:
+            # スキーマ・マイグレーション版が前回適用時から変わっていなければ何もしない
+            if _load_migration_state(conn) == _current_schema_fingerprint(conn):
+                return
+    _apply_schema()
+
+
+def _skip_db_init_requested() -> bool:
+    return os.getenv("APP_SKIP_DB_INIT", "").strip().lower() in ("1", "true", "yes")
+
+
+def _apply_schema() -> None:
+    # 旧テーブル削除・テーブル作成・カラム追加・カラム補正を1トランザクションにまとめ、コミットを1回にする
+    with engine.begin() as conn:
+        # pysqlite は DDL の前に BEGIN を発行しないため、DDL も含めて明示的にトランザクションを開始する
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        tables = _migrate_legacy_purchase_order_tables(conn)
+        # 全モデルのテーブルが揃っていれば create_all（テーブルごとの存在確認）を省く
+        if not tables.issuperset(Base.metadata.tables):
+            Base.metadata.create_all(bind=conn)
+            tables = _existing_tables(conn)
+        _create_missing_indexes(conn)
+        added_columns = _add_missing_columns(conn, tables)
+        # バックフィルは対象カラムを今回追加したときだけ実行する（毎回の全件走査を避ける）
+        if added_columns & {("suppliers", "email_cc"), ("suppliers", "assistant_email")}:
+            conn.execute(_STMT_BACKFILL_ASSISTANT_EMAIL)
+        if ("purchase_order_lines", "received_quantity") in added_columns:
+            conn.execute(_STMT_BACKFILL_RECEIVED_QUANTITY)
+        conn.execute(_STMT_NORMALIZE_UNMANAGED_ITEMS)
+
+    if "item_suppliers" in tables:
+        with engine.connect() as conn:
+            _backfill_item_suppliers(conn)
+
+    with engine.begin() as conn:
+        # ANALYZE で sqlite_stat1 が作られると schema_version が進むため、状態保存より先に実行する
+        conn.exec_driver_sql("PRAGMA optimize")
+        _save_migration_state(conn)
@@ -1,27 +1,43 @@
 import re
+import asyncio
+import csv
+import io
 import json
 import os
 import hmac
 import base64
 import hashlib
+import secrets
 import importlib
+import functools
+import threading
+import time
 from collections import OrderedDict
-from dataclasses import dataclass
-from datetime import date, datetime, timezone
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from operator import attrgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any, Set, Protocol, cast
-from urllib.parse import quote_plus
+from typing import Collection, Dict, FrozenSet, Iterator, List, Mapping, Optional, Sequence, Tuple, Any, Set, Protocol, Union, cast
+from urllib.parse import quote_plus, urlencode
+import orjson
 import yaml
 
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from itsdangerous import TimestampSigner
+from itsdangerous.encoding import want_bytes
 from fastapi import Depends, FastAPI, Form, HTTPException, Query, Request
-from fastapi.responses import HTMLResponse, RedirectResponse, Response, JSONResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+from starlette.middleware.gzip import GZipMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-from sqlalchemy import and_, delete, func, nullsfirst, or_, select, update
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, case, delete, event, func, nullsfirst, or_, select, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.db.session import init_db, get_db, SessionLocal
+from app.db.session import init_db, get_db, get_db_ro, close_request_sessions, SessionLocal
 from app.models.tables import (
     AppUser,
     InventoryItem,
@@ -41,8 +57,11 @@ from app.services import PurchaseOrderError, PurchaseOrderService
 from pydantic import BaseModel
 from zoneinfo import ZoneInfo
 
-@dataclass(frozen=True)
+# 在庫一覧では全品目分を保持するため、インスタンスごとの __dict__ を持たない slots にする
+@dataclass(frozen=True, slots=True)
 class InventorySnapshot:
+    # item_type / usage / department は display_value 済み、shelf / location は normalize_field 済みの値を持つ。
+    # 一覧・絞り込み・サイドバーの各処理はこれを前提に再正規化せずそのまま参照する。
     item_id: int
     item_code: str
     name: str
@@ -58,13 +77,31 @@ class InventorySnapshot:
     last_updated: datetime
     location: str
     supplier: str
+    # キーワード絞り込み用に、検索対象項目を連結・小文字化した文字列を生成時に1回だけ作る
+    search_haystack: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        haystack = ' '.join([
+            self.item_code,
+            self.name,
+            self.item_type,
+            self.usage,
+            self.department,
+        ]).lower()
+        object.__setattr__(self, 'search_haystack', haystack)
 
 UNSET_LABEL = "未設定"
 JST_ZONE = ZoneInfo("Asia/Tokyo")
 SHELF_TOKENIZER = re.compile(r"(\d+)")
 SESSION_USER_ID_KEY = "auth_user_id"
-PASSWORD_HASH_SCHEME = "pbkdf2_sha256"
-PASSWORD_HASH_ITERATIONS = 260000
+# パスワードは Argon2id で保存する。旧形式（pbkdf2_sha256）はログイン成功時に Argon2id へ置き換える
+PASSWORD_HASHER = PasswordHasher(time_cost=3, memory_cost=64 * 1024, parallelism=2)
+ARGON2_HASH_PREFIX = "$argon2"
+LEGACY_PASSWORD_HASH_SCHEME = "pbkdf2_sha256"
+LEGACY_PASSWORD_HASH_ITERATIONS = 260000
+# 形式不正な旧ハッシュでも正規の検証と同じだけ計算するためのダミー入力（結果は常に不一致扱い）
+_LEGACY_DUMMY_SALT = b"\x00" * 16
+_LEGACY_DUMMY_DIGEST = b"\x00" * 32
 ROLE_ADMIN = UserRole.ADMIN.value
 ROLE_MANAGER = UserRole.MANAGER.value
 ROLE_VIEWER = UserRole.VIEWER.value
@@ -77,17 +114,18 @@ SESSION_COOKIE_MAX_AGE: Optional[int] = None if SESSION_MAX_AGE == 0 else SESSIO
 BOOTSTRAP_ADMIN_USERNAME = os.getenv("APP_BOOTSTRAP_ADMIN_USERNAME", "admin")
 BOOTSTRAP_ADMIN_PASSWORD = os.getenv("APP_BOOTSTRAP_ADMIN_PASSWORD", "admin12345")
 BOOTSTRAP_ADMIN_DISPLAY_NAME = os.getenv("APP_BOOTSTRAP_ADMIN_DISPLAY_NAME", "管理者")
+BOOTSTRAP_ADMIN_WAIT_SECONDS = 10.0
 LOGIN_ROUTE_PATH = "/login"
-AUTH_EXEMPT_PATHS: Set[str] = {
+AUTH_EXEMPT_PATHS: FrozenSet[str] = frozenset({
     LOGIN_ROUTE_PATH,
     "/logout",
     "/internal/docs",
     "/internal/openapi.json",
-}
+})
 # 一般ユーザー向け：ログイン不要で利用可能なパス
 # - ダッシュボード・在庫一覧・履歴ページ
 # - 在庫一覧から利用する API（recent-transactions / 出庫 / inline-adjust）
-PUBLIC_PATHS: Set[str] = {
+PUBLIC_PATHS: FrozenSet[str] = frozenset({
     "/",
     "/dashboard",
     "/inventory",
@@ -96,8 +134,9 @@ PUBLIC_PATHS: Set[str] = {
     "/inventory/issues",
     "/inventory/inline-adjust",
     "/api/inventory/issues",
-}
-AUTH_EXEMPT_PREFIXES: Tuple[str, ...] = ("/static", "/internal/docs")
+})
+STATIC_PATH_PREFIX = "/static"
+AUTH_EXEMPT_PREFIXES: Tuple[str, ...] = (STATIC_PATH_PREFIX, "/internal/docs")
 API_AUTH_PREFIXES: Tuple[str, ...] = (
     "/api/",
     "/purchase-orders",
@@ -110,30 +149,51 @@ ROLE_PRIORITY: Dict[str, int] = {
     ROLE_MANAGER: 20,
     ROLE_ADMIN: 30,
 }
+MANAGER_ROLE_PRIORITY = ROLE_PRIORITY[ROLE_MANAGER]
 
 
 def hash_password(password: str) -> str:
-    salt = os.urandom(16)
-    digest = hashlib.pbkdf2_hmac(
-        "sha256",
-        password.encode("utf-8"),
-        salt,
-        PASSWORD_HASH_ITERATIONS,
-    )
-    salt_b64 = base64.b64encode(salt).decode("ascii")
-    digest_b64 = base64.b64encode(digest).decode("ascii")
-    return f"{PASSWORD_HASH_SCHEME}${PASSWORD_HASH_ITERATIONS}${salt_b64}${digest_b64}"
+    return PASSWORD_HASHER.hash(password)
+
+
+def password_needs_rehash(encoded_password: str) -> bool:
+    """旧形式（pbkdf2_sha256）またはパラメータが古い Argon2id ハッシュなら True。"""
+    if not encoded_password.startswith(ARGON2_HASH_PREFIX):
+        return True
+    try:
+        return PASSWORD_HASHER.check_needs_rehash(encoded_password)
+    except InvalidHashError:
+        return True
 
 
 def verify_password(password: str, encoded_password: str) -> bool:
+    if encoded_password.startswith(ARGON2_HASH_PREFIX):
+        try:
+            return PASSWORD_HASHER.verify(encoded_password, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return _verify_legacy_pbkdf2_password(password, encoded_password)
+
+
+def _verify_legacy_pbkdf2_password(password: str, encoded_password: str) -> bool:
+    """移行前に作成された pbkdf2_sha256 形式のハッシュを検証する。"""
     try:
         scheme, iterations_raw, salt_b64, digest_b64 = encoded_password.split("$", 3)
-        if scheme != PASSWORD_HASH_SCHEME:
-            return False
+        if scheme != LEGACY_PASSWORD_HASH_SCHEME:
+            raise ValueError(scheme)
         iterations = int(iterations_raw)
         salt = base64.b64decode(salt_b64.encode("ascii"))
         expected_digest = base64.b64decode(digest_b64.encode("ascii"))
     except Exception:
+        # 形式不正で即座に False を返すと応答時間の差からハッシュの状態を推測できるため、
+        # ダミー入力で同じ回数の計算と比較を行ってから不一致とする
+        dummy_digest = hashlib.pbkdf2_hmac(
+            "sha256",
+            password.encode("utf-8"),
+            _LEGACY_DUMMY_SALT,
+            LEGACY_PASSWORD_HASH_ITERATIONS,
+        )
+        hmac.compare_digest(dummy_digest, _LEGACY_DUMMY_DIGEST)
         return False
 
     actual_digest = hashlib.pbkdf2_hmac(
@@ -145,6 +205,12 @@ def verify_password(password: str, encoded_password: str) -> bool:
     return hmac.compare_digest(actual_digest, expected_digest)
 
 
+@functools.cache
+def _dummy_password_hash() -> str:
+    """存在しないユーザーのログイン試行でも照合処理を行うためのハッシュ（初回利用時に1回だけ生成）。"""
+    return hash_password(secrets.token_urlsafe(16))
+
+
 def get_role_value(role: object) -> str:
     if isinstance(role, UserRole):
         return role.value
@@ -160,8 +226,7 @@ def is_admin_user(user: Optional[Dict[str, Any]]) -> bool:
 def is_manager_or_higher_user(user: Optional[Dict[str, Any]]) -> bool:
     if not user:
         return False
-    role = str(user.get("role") or "")
-    return ROLE_PRIORITY.get(role, 0) >= ROLE_PRIORITY.get(ROLE_MANAGER, 0)
+    return user.get("priority", 0) >= MANAGER_ROLE_PRIORITY
 
 
 def _is_safe_next_path(path: str) -> bool:
@@ -175,9 +240,8 @@ def _normalize_next_path(path: str) -> str:
 
 
 def _is_auth_exempt_path(path: str) -> bool:
-    if path in AUTH_EXEMPT_PATHS:
-        return True
-    return any(path.startswith(prefix) for prefix in AUTH_EXEMPT_PREFIXES)
+    # str.startswith はタプルを受け取り、全プレフィックスを1回の呼び出しで判定する
+    return path in AUTH_EXEMPT_PATHS or path.startswith(AUTH_EXEMPT_PREFIXES)
 
 
 def _is_public_path(path: str) -> bool:
@@ -186,18 +250,75 @@ def _is_public_path(path: str) -> bool:
 
 
 def _is_api_auth_path(path: str) -> bool:
-    return any(path.startswith(prefix) for prefix in API_AUTH_PREFIXES)
+    return path.startswith(API_AUTH_PREFIXES)
 
 
 def _build_user_context(user: AppUser) -> Dict[str, Any]:
+    role = get_role_value(user.role)
     return {
         "id": user.id,
         "username": user.username,
         "display_name": user.display_name,
-        "role": get_role_value(user.role),
+        "role": role,
+        # 権限判定のたびに ROLE_PRIORITY を引かないよう、ロールの優先度もここで持たせる
+        "priority": ROLE_PRIORITY.get(role, 0),
     }
 
 
+# ログインユーザー情報のプロセス内キャッシュ（user_id -> (取得時刻, コンテキスト)）。
+# リクエストごとの app_users 参照を省く。AppUser を更新したセッションのコミット時に該当ユーザー分を破棄する
+USER_CONTEXT_CACHE_TTL_SECONDS = 60.0
+USER_CONTEXT_CACHE_MAX_ENTRIES = 1024
+_USER_CONTEXT_DIRTY_KEY = "user_context_dirty_ids"
+_user_context_cache: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_user_context_cache_lock = threading.Lock()
+
+
+def _get_cached_user_context(user_id: int) -> Optional[Dict[str, Any]]:
+    with _user_context_cache_lock:
+        cached = _user_context_cache.get(user_id)
+        if cached is None:
+            return None
+        loaded_at, context = cached
+        if time.monotonic() - loaded_at >= USER_CONTEXT_CACHE_TTL_SECONDS:
+            del _user_context_cache[user_id]
+            return None
+        _user_context_cache.move_to_end(user_id)
+        # 呼び出し側で書き換えられてもキャッシュに影響しないよう複製を返す
+        return dict(context)
+
+
+def _store_user_context(user_id: int, context: Dict[str, Any]) -> None:
+    with _user_context_cache_lock:
+        _user_context_cache[user_id] = (time.monotonic(), dict(context))
+        _user_context_cache.move_to_end(user_id)
+        while len(_user_context_cache) > USER_CONTEXT_CACHE_MAX_ENTRIES:
+            _user_context_cache.popitem(last=False)
+
+
+def invalidate_user_context(user_id: int) -> None:
+    with _user_context_cache_lock:
+        _user_context_cache.pop(user_id, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_user_context_dirty(session: Session, flush_context: Any) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, AppUser) and obj.id is not None:
+            session.info.setdefault(_USER_CONTEXT_DIRTY_KEY, set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_user_context_on_commit(session: Session) -> None:
+    for user_id in session.info.pop(_USER_CONTEXT_DIRTY_KEY, ()):
+        invalidate_user_context(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_context_mark(session: Session) -> None:
+    session.info.pop(_USER_CONTEXT_DIRTY_KEY, None)
+
+
 def load_user_context_from_session(request: Request) -> Optional[Dict[str, Any]]:
     raw_user_id = request.session.get(SESSION_USER_ID_KEY)
     try:
@@ -205,17 +326,24 @@ def load_user_context_from_session(request: Request) -> Optional[Dict[str, Any]]
     except (TypeError, ValueError):
         return None
 
-    with SessionLocal() as db:
-        user = db.scalar(
-            select(AppUser).filter(
-                AppUser.id == user_id,
-                AppUser.is_active.is_(True),
-            )
+    cached = _get_cached_user_context(user_id)
+    if cached is not None:
+        return cached
+
+    # 別途セッションを開かず、エンドポイントの get_db_ro と共有するリクエスト単位のセッションを使う
+    db = get_db_ro(request)
+    user = db.scalar(
+        select(AppUser).filter(
+            AppUser.id == user_id,
+            AppUser.is_active.is_(True),
         )
-        if not user:
-            request.session.pop(SESSION_USER_ID_KEY, None)
-            return None
-        return _build_user_context(user)
+    )
+    if not user:
+        request.session.pop(SESSION_USER_ID_KEY, None)
+        return None
+    context = _build_user_context(user)
+    _store_user_context(user_id, context)
+    return context
 
 
 def get_request_user(request: Request) -> Dict[str, Any]:
@@ -241,8 +369,7 @@ def get_optional_user(request: Request) -> Optional[Dict[str, Any]]:
 
 def require_role(request: Request, minimum_role: str) -> Dict[str, Any]:
     user = get_request_user(request)
-    user_role = str(user.get("role") or "")
-    if ROLE_PRIORITY.get(user_role, 0) < ROLE_PRIORITY.get(minimum_role, 0):
+    if user.get("priority", 0) < ROLE_PRIORITY.get(minimum_role, 0):
         raise HTTPException(status_code=403, detail="この操作を実行する権限がありません。")
     return user
 
@@ -494,7 +621,9 @@ def display_value(value: Optional[str]) -> str:
     return normalized if normalized else UNSET_LABEL
 
 
+@functools.lru_cache(maxsize=4096)
 def natural_shelf_key(value: str) -> Tuple:
+    # 棚番の種類は少なく毎リクエスト同じ文字列を分割するため、結果（不変のタプル）をキャッシュする
     parts: List[Tuple[bool, object]] = []
     for part in SHELF_TOKENIZER.split(value):
         if part.isdigit():
@@ -505,21 +634,31 @@ def natural_shelf_key(value: str) -> Tuple:
 
 
 def shelf_sort_key(snapshot: InventorySnapshot) -> Tuple[bool, Tuple, str]:
-    shelf = normalize_field(snapshot.shelf)
+    shelf = snapshot.shelf or ""
     has_shelf = bool(shelf)
     key = natural_shelf_key(shelf) if shelf else ()
     return (not has_shelf, key, snapshot.item_code)
 
 
+# 現在時刻（JST）。関数を1段挟まないよう、datetime.now に JST_ZONE を束縛しておく
+now_jst: "functools.partial[datetime]" = functools.partial(datetime.now, JST_ZONE)
+
+
 def to_jst(value: Optional[datetime]) -> datetime:
     """日時を JST に変換する。タイムゾーン未指定の場合は JST として解釈（在庫取引は JST で記録する前提）。"""
     if not value:
-        return datetime.now(JST_ZONE)
+        return now_jst()
     if value.tzinfo is None:
-        value = value.replace(tzinfo=JST_ZONE)
+        return value.replace(tzinfo=JST_ZONE)
+    if value.tzinfo is JST_ZONE:
+        return value
     return value.astimezone(JST_ZONE)
 
 
+# libyaml があれば C 実装の SafeLoader を使う（挙動は yaml.safe_load と同じ）
+YAML_SAFE_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
 def load_usage_order_config(path: Path) -> Tuple[List[str], Dict[str, Dict[str, int]], Dict[str, Dict[str, Dict[str, int]]]]:
     departments: List[str] = []
     usage_order: Dict[str, Dict[str, int]] = {}
@@ -528,8 +667,8 @@ def load_usage_order_config(path: Path) -> Tuple[List[str], Dict[str, Dict[str,
         return departments, usage_order, type_order
     raw = {}
     try:
-        with path.open("r", encoding="utf-8") as stream:
-            raw = yaml.safe_load(stream) or {}
+        # バイト列を渡すとエンコーディング判定（BOM を含む）は libyaml 側で行われる
+        raw = yaml.load(path.read_bytes(), Loader=YAML_SAFE_LOADER) or {}
     except Exception:
         return departments, usage_order, type_order
     for dept_entry in raw.get("departments") or []:
@@ -556,6 +695,19 @@ USAGE_ORDER_PATH = PROJECT_ROOT / "config" / "usage_order.yaml"
 EMAIL_SETTINGS_PATH = PROJECT_ROOT / "config" / "email_settings.json"
 DEPARTMENT_ORDER, USAGE_ORDER, TYPE_ORDER = load_usage_order_config(USAGE_ORDER_PATH)
 DEPARTMENT_ORDER_INDEX = {name: idx for idx, name in enumerate(DEPARTMENT_ORDER)}
+# 並び替えのキー関数で1回の辞書参照で済むよう、(部署, 用途, 種別) をキーにした平坦な索引も持つ
+TYPE_ORDER_FLAT: Dict[Tuple[str, str, str], int] = {
+    (dept, usage, type_name): idx
+    for dept, usages in TYPE_ORDER.items()
+    for usage, types in usages.items()
+    for type_name, idx in types.items()
+}
+# 部署・用途を並び順どおりに列挙したもの。サイドバーは既知の名前をこの順で拾い、残りだけを名前順に並べる
+DEPARTMENT_ORDER_SEQUENCE: Tuple[str, ...] = tuple(sorted(DEPARTMENT_ORDER_INDEX, key=DEPARTMENT_ORDER_INDEX.__getitem__))
+USAGE_ORDER_SEQUENCE: Dict[str, Tuple[str, ...]] = {
+    dept: tuple(sorted(usages, key=usages.__getitem__))
+    for dept, usages in USAGE_ORDER.items()
+}
 
 
 def _normalize_departments(value: object) -> List[str]:
@@ -596,9 +748,16 @@ def _build_contacts_from_email_settings(raw: object) -> Tuple[List[str], Dict[st
                 account_display_names[account_key] = display_name
                 account_departments[account_key] = departments
 
-    contacts: List[str] = []
+    # 重複除去と出現順の保持を dict のキーで行う（リストの in 判定による二乗の走査を避ける）
+    contact_labels: Dict[str, None] = {}
     defaults: Dict[str, str] = {}
-    contacts_by_department: Dict[str, List[str]] = {}
+    labels_by_department: Dict[str, Dict[str, None]] = {}
+
+    def add_label(department_name: str, label: str) -> None:
+        labels_by_department.setdefault(department_name, {})[label] = None
+        contact_labels[label] = None
+
+    # 部署の既定担当者を先に並べ、続けて各アカウントの所属部署分を加える
     if isinstance(department_defaults_raw, dict):
         for department, account_key in department_defaults_raw.items():
             department_name = str(department).strip()
@@ -611,34 +770,48 @@ def _build_contacts_from_email_settings(raw: object) -> Tuple[List[str], Dict[st
                 continue
             label = f"{department_name} {display_name}".strip()
             defaults[department_name] = label
-            if label not in contacts_by_department.setdefault(department_name, []):
-                contacts_by_department[department_name].append(label)
-            if label not in contacts:
-                contacts.append(label)
+            add_label(department_name, label)
 
     for account_key, display_name in account_display_names.items():
-        departments = account_departments.get(account_key, [])
-        for department_name in departments:
-            label = f"{department_name} {display_name}".strip()
-            if label not in contacts_by_department.setdefault(department_name, []):
-                contacts_by_department[department_name].append(label)
-            if label not in contacts:
-                contacts.append(label)
+        for department_name in account_departments.get(account_key, []):
+            add_label(department_name, f"{department_name} {display_name}".strip())
 
+    contacts = list(contact_labels)
+    contacts_by_department = {department: list(labels) for department, labels in labels_by_department.items()}
     return contacts, defaults, contacts_by_department
 
 
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+
+def _read_json_file(path: Path) -> object:
+    # 文字列へデコードせずバイト列のまま orjson（C 実装）で解析する。BOM 付きファイルは先頭3バイトを除く
+    raw = path.read_bytes()
+    if raw.startswith(_UTF8_BOM):
+        raw = raw[len(_UTF8_BOM):]
+    return orjson.loads(raw)
+
+
 def load_order_contacts(email_settings_path: Path) -> Tuple[List[str], Dict[str, str], Dict[str, List[str]]]:
-    if email_settings_path.exists():
-        try:
-            with email_settings_path.open("r", encoding="utf-8-sig") as stream:
-                settings = json.load(stream)
-        except Exception:
-            settings = {}
-        contacts, defaults, contacts_by_department = _build_contacts_from_email_settings(settings)
-        if contacts:
-            return contacts, defaults, contacts_by_department
+    """email_settings から発注担当者を読み込む。ファイルの更新日時・サイズが同じ間は前回の結果を返す（呼び出し側で変更しないこと）。"""
+    try:
+        stat = email_settings_path.stat()
+    except OSError:
+        return [], {}, {}
+    return _load_order_contacts_cached(email_settings_path, stat.st_mtime_ns, stat.st_size)
+
 
+@functools.lru_cache(maxsize=8)
+def _load_order_contacts_cached(
+    email_settings_path: Path, mtime_ns: int, size: int
+) -> Tuple[List[str], Dict[str, str], Dict[str, List[str]]]:
+    try:
+        settings = _read_json_file(email_settings_path)
+    except Exception:
+        settings = {}
+    contacts, defaults, contacts_by_department = _build_contacts_from_email_settings(settings)
+    if contacts:
+        return contacts, defaults, contacts_by_department
     return [], {}, {}
 
 
@@ -655,8 +828,7 @@ def load_email_settings_config(path: Path) -> Dict[str, object]:
     if not path.exists():
         return default_value
     try:
-        with path.open("r", encoding="utf-8-sig") as stream:
-            raw = json.load(stream)
+        raw = _read_json_file(path)
     except Exception:
         return default_value
     if not isinstance(raw, dict):
@@ -718,96 +890,116 @@ def normalize_email_settings(raw: object) -> Dict[str, object]:
 
 
 def save_email_settings_config(path: Path, settings: Dict[str, object]) -> None:
+    """設定を一時ファイル経由で置き換える。内容が現在のファイルと同じなら書き込まない。"""
+    payload = orjson.dumps(settings, option=orjson.OPT_INDENT_2)
+    try:
+        if path.read_bytes() == payload:
+            return
+    except OSError:
+        pass
     path.parent.mkdir(parents=True, exist_ok=True)
     temp_path = path.with_suffix(path.suffix + ".tmp")
-    with temp_path.open("w", encoding="utf-8", newline="\n") as stream:
-        json.dump(settings, stream, ensure_ascii=False, indent=2)
+    temp_path.write_bytes(payload)
     temp_path.replace(path)
 
 
+def load_normalized_email_settings(path: Path) -> Dict[str, object]:
+    """正規化済みのメール設定。ファイルの更新日時・サイズが同じ間は前回の結果を返す（呼び出し側で変更しないこと）。"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return normalize_email_settings(load_email_settings_config(path))
+    return _load_normalized_email_settings_cached(path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_normalized_email_settings_cached(path: Path, mtime_ns: int, size: int) -> Dict[str, object]:
+    return normalize_email_settings(load_email_settings_config(path))
+
+
+# keyring の照会（Windows の資格情報マネージャー等）は1件ごとに時間がかかるため、
+# 送信元ごとの登録有無を短時間だけ覚えておく。このプロセスで登録した場合は即時に反映する
+KEYRING_PROBE_TTL_SECONDS = 30.0
+_keyring_probe_lock = threading.Lock()
+_keyring_probe_cache: Dict[str, Tuple[float, bool]] = {}
+
+
+def is_email_password_registered(keyring_module: KeyringModule, sender: str) -> bool:
+    now = time.monotonic()
+    with _keyring_probe_lock:
+        cached = _keyring_probe_cache.get(sender)
+    if cached is not None and now - cached[0] < KEYRING_PROBE_TTL_SECONDS:
+        return cached[1]
+    registered = bool(keyring_module.get_password("purchase_order_app", sender))
+    with _keyring_probe_lock:
+        _keyring_probe_cache[sender] = (now, registered)
+    return registered
+
+
+def remember_email_password_registered(sender: str) -> None:
+    with _keyring_probe_lock:
+        _keyring_probe_cache[sender] = (time.monotonic(), True)
+
+
 def get_purchase_order_service(db: Session) -> PurchaseOrderService:
     return PurchaseOrderService(db=db, templates=templates, project_root=PROJECT_ROOT)
 
-SAMPLE_INVENTORY: List[InventorySnapshot] = [
-    InventorySnapshot(
-        item_id=1,
-        item_code='16167',
-        name='ボーリングバイト',
-        item_type='工具',
-        usage='加工',
-        department='生産部',
-        manufacturer='まじま機工',
-        shelf='A-01',
-        unit='本',
-        on_hand=12,
-        reorder_point=20,
-        last_activity='出庫',
-        last_updated=datetime(2026, 1, 28, 16, 12),
-        location='A-01',
-        supplier='まじま機工',
-    ),
-    InventorySnapshot(
-        item_id=2,
-        item_code='21346',
-        name='ネジ切りバイト',
-        item_type='工具',
-        usage='加工',
-        department='品質保証部',
-        manufacturer='まじま機工',
-        shelf='A-02',
-        unit='本',
-        on_hand=4,
-        reorder_point=5,
-        last_activity='出庫',
-        last_updated=datetime(2026, 1, 29, 9, 45),
-        location='A-02',
-        supplier='まじま機工',
-    ),
-    InventorySnapshot(
-        item_id=3,
-        item_code='440617',
-        name='クイックルハンディ取替用シート',
-        item_type='清掃用品',
-        usage='清掃',
-        department='総務部',
-        manufacturer='花王',
-        shelf='C-11',
-        unit='袋',
-        on_hand=5,
-        reorder_point=8,
-        last_activity='調整',
-        last_updated=datetime(2026, 1, 30, 10, 30),
-        location='C-11',
-        supplier='岩瀬産業(株)',
-    ),
-]
-
-RECENT_TRANSACTIONS = [
-    {
-        'item': 'ボーリングバイト',
-        'department': '生産部',
-        'type': '出庫',
-        'delta': '-2 本',
-        'date': '2026/01/29 14:10',
-        'note': '現場使用',
-    },
-    {
-        'item': 'ネジ切りバイト',
-        'department': '品質保証部',
-        'type': '調整',
-        'delta': '+1 本',
-        'date': '2026/01/29 11:50',
-        'note': '棚卸差分補正',
-    },
-    {
-        'item': 'クイックルハンディ取替用シート',
-        'department': '総務部',
-        'type': '出庫',
-        'delta': '-1 袋',
-        'date': '2026/01/28 09:30',
-        'note': '清掃で使用',
-    },
-]
+@functools.cache
+def sample_inventory() -> List[InventorySnapshot]:
+    """DB に品目が無いときの表示用サンプル。使われるのは初回セットアップ時のみのため、必要になるまで生成しない。"""
+    return [
+        InventorySnapshot(
+            item_id=1,
+            item_code='16167',
+            name='ボーリングバイト',
+            item_type='工具',
+            usage='加工',
+            department='生産部',
+            manufacturer='まじま機工',
+            shelf='A-01',
+            unit='本',
+            on_hand=12,
+            reorder_point=20,
+            last_activity='出庫',
+            last_updated=datetime(2026, 1, 28, 16, 12),
+            location='A-01',
+            supplier='まじま機工',
+        ),
+        InventorySnapshot(
+            item_id=2,
+            item_code='21346',
+            name='ネジ切りバイト',
+            item_type='工具',
+            usage='加工',
+            department='品質保証部',
+            manufacturer='まじま機工',
+            shelf='A-02',
+            unit='本',
+            on_hand=4,
+            reorder_point=5,
+            last_activity='出庫',
+            last_updated=datetime(2026, 1, 29, 9, 45),
+            location='A-02',
+            supplier='まじま機工',
+        ),
+        InventorySnapshot(
+            item_id=3,
+            item_code='440617',
+            name='クイックルハンディ取替用シート',
+            item_type='清掃用品',
+            usage='清掃',
+            department='総務部',
+            manufacturer='花王',
+            shelf='C-11',
+            unit='袋',
+            on_hand=5,
+            reorder_point=8,
+            last_activity='調整',
+            last_updated=datetime(2026, 1, 30, 10, 30),
+            location='C-11',
+            supplier='岩瀬産業(株)',
+        ),
+    ]
 
 BASE_NAV_LINKS = [
     {'label': 'ダッシュボード', 'href': '/dashboard'},
@@ -821,20 +1013,27 @@ BASE_NAV_LINKS = [
 ]
 
 
-def build_nav_links(active_href: str, current_user: Optional[Dict[str, Any]] = None) -> List[Dict[str, object]]:
+def build_nav_links(active_href: str, current_user: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, object], ...]:
     """画面上部のナビゲーションリンク一覧を構築する。
 
     - 左側: 共通メニュー（ダッシュボード、在庫管理、発注管理など）
     - 右側: 管理者ログイン / ログアウト
       - 管理者ログインは常に表示（管理者・担当者がここからログインできるようにする）
       - ログアウトはログイン済みの場合のみ表示
+
+    結果は (表示中のパス, manager 以上か, ログイン済みか) ごとに共有するため、呼び出し側で変更しないこと。
     """
+    return _build_nav_links(active_href, is_manager_or_higher_user(current_user), bool(current_user))
+
+
+@functools.lru_cache(maxsize=64)
+def _build_nav_links(active_href: str, is_manager: bool, logged_in: bool) -> Tuple[Dict[str, object], ...]:
     links: List[Dict[str, object]] = []
     for link in BASE_NAV_LINKS:
-        if link["href"] == "/manage/suppliers" and not is_manager_or_higher_user(current_user):
+        if link["href"] == "/manage/suppliers" and not is_manager:
             # データ管理は manager 以上のみ表示
             continue
-        if link["href"] in ("/orders", "/logistics", "/purchase-results") and not is_manager_or_higher_user(current_user):
+        if link["href"] in ("/orders", "/logistics", "/purchase-results") and not is_manager:
             # 発注管理・入出庫管理・購入品管理は manager 以上のみ表示
             continue
         links.append(
@@ -858,7 +1057,7 @@ def build_nav_links(active_href: str, current_user: Optional[Dict[str, Any]] = N
     )
 
     # ログイン済みの場合のみログアウトを表示（管理者ログインの右側）
-    if current_user:
+    if logged_in:
         links.append(
             {
                 "label": "ログアウト",
@@ -868,11 +1067,12 @@ def build_nav_links(active_href: str, current_user: Optional[Dict[str, Any]] = N
             }
         )
 
-    return links
+    return tuple(links)
 
-def count_deliveries_due_today(db: Session) -> int:
-    """本日が回答納期かつ入荷待ちの発注件数を返す（DB実データのみ）。"""
-    today = datetime.now(JST_ZONE).date()
+def count_deliveries_due_today(db: Session, today: Optional[date] = None) -> int:
+    """本日が回答納期かつ入荷待ちの発注件数を返す（DB実データのみ）。today はリクエストで取得済みの日付を渡せる。"""
+    if today is None:
+        today = now_jst().date()
     subq = (
         select(PurchaseOrderLine.purchase_order_id)
         .select_from(PurchaseOrderLine)
@@ -898,35 +1098,22 @@ def load_item_order_status_map(db: Session, item_ids: List[int]) -> Dict[int, Tu
         PurchaseOrderStatus.SENT.value,
         PurchaseOrderStatus.WAITING.value,
     ]
+    waiting_statuses = [PurchaseOrderStatus.SENT.value, PurchaseOrderStatus.WAITING.value]
+    # 品目ごとの集約（入荷待ちの有無・最も早い納期）は SQL 側で行い、1品目1行だけを受け取る
     stmt = (
         select(
             PurchaseOrderLine.item_id,
-            PurchaseOrder.status,
-            PurchaseOrderLine.vendor_reply_due_date,
+            func.max(case((PurchaseOrder.status.in_(waiting_statuses), 1), else_=0)),
+            func.min(PurchaseOrderLine.vendor_reply_due_date),
         )
         .select_from(PurchaseOrderLine)
         .join(PurchaseOrder, PurchaseOrder.id == PurchaseOrderLine.purchase_order_id)
         .where(PurchaseOrder.status.in_(open_statuses))
         .where(PurchaseOrderLine.item_id.in_(item_ids))
+        .group_by(PurchaseOrderLine.item_id)
     )
-    rows = db.execute(stmt).all()
-    # item_id -> (is_waiting: bool, earliest_due: date|None)
-    by_item: Dict[int, Tuple[bool, Optional[date]]] = {}
-    for item_id, order_status, due_date in rows:
-        if item_id is None:
-            continue
-        is_waiting = order_status in (PurchaseOrderStatus.SENT.value, PurchaseOrderStatus.WAITING.value)
-        prev = by_item.get(item_id)
-        if prev is None:
-            by_item[item_id] = (is_waiting, due_date)
-        else:
-            prev_waiting, prev_due = prev
-            earliest = prev_due
-            if due_date is not None and (earliest is None or due_date < earliest):
-                earliest = due_date
-            by_item[item_id] = (prev_waiting or is_waiting, earliest)
     result: Dict[int, Tuple[str, str]] = {}
-    for iid, (is_waiting, due) in by_item.items():
+    for iid, is_waiting, due in db.execute(stmt):
         status_ja = "入荷待ち" if is_waiting else "発注依頼済"
         due_str = due.strftime("%Y/%m/%d") if due else ""
         result[iid] = (status_ja, due_str)
@@ -939,12 +1126,27 @@ app = FastAPI(
     docs_url='/internal/docs',
     redoc_url=None,
     openapi_url='/internal/openapi.json',
+    default_response_class=ORJSONResponse,
 )
 
+# 初期管理者の作成（パスワードハッシュ計算を含む）の完了通知。ログイン処理はこれを待ってから照合する
+_bootstrap_admin_ready = threading.Event()
+_bootstrap_admin_task: Optional["asyncio.Task[None]"] = None
+
+
+def _run_bootstrap_admin_user() -> None:
+    try:
+        ensure_bootstrap_admin_user()
+    finally:
+        _bootstrap_admin_ready.set()
+
+
 @app.on_event("startup")
-def on_startup() -> None:
-    init_db()
-    ensure_bootstrap_admin_user()
+async def on_startup() -> None:
+    global _bootstrap_admin_task
+    await asyncio.to_thread(init_db)
+    # 初期管理者の作成は受付開始を待たせないようスレッドで進める
+    _bootstrap_admin_task = asyncio.create_task(asyncio.to_thread(_run_bootstrap_admin_user))
 
 BASE_DIR = Path(__file__).resolve().parent
 TEMPLATE_DIR = BASE_DIR / 'web' / 'templates'
@@ -962,12 +1164,23 @@ PURCHASE_ORDER_STATUS_JA = {
 
 def _filter_status_ja(value: str) -> str:
     """発注ステータスを日本語ラベルに変換するJinjaフィルタ用"""
-    return PURCHASE_ORDER_STATUS_JA.get(str(value), str(value))
+    # ステータスは文字列（または str 派生の Enum）で渡るため、そのままキーにして引く
+    label = PURCHASE_ORDER_STATUS_JA.get(value)
+    return label if label is not None else str(value)
+
+def _filter_urlencode(value: object) -> str:
+    """クエリ文字列用に値をエンコードするJinjaフィルタ用"""
+    return quote_plus(str(value))
+
+# 本番ではテンプレート更新の確認（毎回の stat）を止める。コンパイル結果はバイトコードキャッシュに保存し、再起動後の初回描画でも再パースしない
+TEMPLATE_AUTO_RELOAD = os.getenv("APP_TEMPLATE_AUTO_RELOAD", "1").strip().lower() not in ("0", "false", "no")
 
 templates = Jinja2Templates(directory=TEMPLATE_DIR)
-templates.env.filters['urlencode'] = lambda value: quote_plus(str(value))
+templates.env.auto_reload = TEMPLATE_AUTO_RELOAD
+templates.env.bytecode_cache = FileSystemBytecodeCache()
+templates.env.filters['urlencode'] = _filter_urlencode
 templates.env.filters['status_ja'] = _filter_status_ja
-app.mount('/static', StaticFiles(directory=STATIC_DIR), name='static')
+app.mount(STATIC_PATH_PREFIX, StaticFiles(directory=STATIC_DIR), name='static')
 
 
 class AuthContextMiddleware:
@@ -981,34 +1194,31 @@ class AuthContextMiddleware:
             await self.app(scope, receive, send)
             return
 
-        request = Request(scope, receive=receive)
-        path = request.url.path
-
-        # 認証完全免除（ログイン画面・ログアウト・静的・API docs）
-        if _is_auth_exempt_path(path):
-            user = load_user_context_from_session(request)
-            if user:
-                scope.setdefault("state", {})["current_user"] = user
+        path = scope["path"]
+        # 静的ファイルはログイン状態を参照しないため、Request の生成・セッション参照をせずに通す
+        if path.startswith(STATIC_PATH_PREFIX):
             await self.app(scope, receive, send)
             return
 
+        user = self._load_user(scope, receive)
+
+        # 認証完全免除（ログイン画面・ログアウト・API docs）と、
         # 一般ユーザー向け公開パス（ダッシュボード・在庫一覧など）はログイン不要
-        if _is_public_path(path):
-            user = load_user_context_from_session(request)
+        if _is_auth_exempt_path(path) or _is_public_path(path):
             if user:
                 scope.setdefault("state", {})["current_user"] = user
             await self.app(scope, receive, send)
             return
 
         # 上記以外はログイン必須
-        user = load_user_context_from_session(request)
         if not user:
             if _is_api_auth_path(path):
-                response = JSONResponse(status_code=401, content={"detail": "ログインが必要です。"})
+                response = ORJSONResponse(status_code=401, content={"detail": "ログインが必要です。"})
             else:
                 next_path = path
-                if request.url.query:
-                    next_path = f"{next_path}?{request.url.query}"
+                query_string = scope.get("query_string", b"").decode("latin-1")
+                if query_string:
+                    next_path = f"{next_path}?{query_string}"
                 redirect_next = quote_plus(next_path)
                 response = RedirectResponse(url=f"{LOGIN_ROUTE_PATH}?next={redirect_next}", status_code=303)
             await response(scope, receive, send)
@@ -1017,15 +1227,65 @@ class AuthContextMiddleware:
         scope.setdefault("state", {})["current_user"] = user
         await self.app(scope, receive, send)
 
+    @staticmethod
+    def _load_user(scope: Dict[str, Any], receive: Any) -> Optional[Dict[str, Any]]:
+        # 未ログイン（セッションにユーザーIDがない）なら Request を作らずに済ませる
+        session = scope.get("session")
+        if not session or SESSION_USER_ID_KEY not in session:
+            return None
+        return load_user_context_from_session(Request(scope, receive=receive))
+
+
+class DbSessionCleanupMiddleware:
+    """get_db / get_db_ro で払い出したリクエスト単位のセッションを応答後に close する。"""
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            close_request_sessions(scope.get("state") or {})
+
+
+class _DerivedKeyCachingSigner(TimestampSigner):
+    """秘密鍵からの署名鍵の導出結果を保持する TimestampSigner（Cookie の検証・署名ごとのハッシュ計算を省く）。"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._derived_keys: Dict[Optional[bytes], bytes] = {}
+
+    def derive_key(self, secret_key: Optional[Union[str, bytes]] = None) -> bytes:
+        cache_key = None if secret_key is None else want_bytes(secret_key)
+        derived = self._derived_keys.get(cache_key)
+        if derived is None:
+            derived = self._derived_keys[cache_key] = super().derive_key(secret_key)
+        return derived
+
+
+class CachedKeySessionMiddleware(SessionMiddleware):
+    """SessionMiddleware と同じ Cookie 形式（署名方式も同じ）で、署名鍵の導出を起動時の1回にする。"""
+
+    def __init__(self, app: Any, secret_key: str, **kwargs: Any) -> None:
+        super().__init__(app, secret_key, **kwargs)
+        self.signer = _DerivedKeyCachingSigner(str(secret_key))
+
 
 app.add_middleware(AuthContextMiddleware)
+app.add_middleware(DbSessionCleanupMiddleware)
 # max_age: セッションCookieの有効期限。None=ブラウザ終了まで。>0で同一端末でログイン状態を保持（例: 14日）
 app.add_middleware(
-    SessionMiddleware,
+    CachedKeySessionMiddleware,
     secret_key=SESSION_SECRET,
     same_site="lax",
     max_age=SESSION_COOKIE_MAX_AGE,
 )
+# 一番外側に置き、認証のリダイレクト・401 を含むすべての応答を圧縮対象にする（1KB 未満は圧縮しない）
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 
 @app.get(LOGIN_ROUTE_PATH, response_class=HTMLResponse, include_in_schema=False)
@@ -1033,7 +1293,8 @@ def login_page(
     request: Request,
     next: str = Query("/dashboard"),
 ) -> HTMLResponse:
-    current_user = load_user_context_from_session(request)
+    # ログイン状態は AuthContextMiddleware が解決済み。未ログインならセッションを読み直さない
+    current_user = getattr(request.state, "current_user", None)
     next_path = _normalize_next_path(next)
     if current_user:
         return RedirectResponse(url=next_path, status_code=303)
@@ -1062,6 +1323,8 @@ def login_submit(
         }
         return templates.TemplateResponse("login.html", context, status_code=400)
 
+    # 起動直後は初期管理者の作成が終わるまで待つ（未作成のまま照合して失敗させない）
+    _bootstrap_admin_ready.wait(timeout=BOOTSTRAP_ADMIN_WAIT_SECONDS)
     with SessionLocal() as db:
         user = db.scalar(
             select(AppUser).filter(
@@ -1069,6 +1332,9 @@ def login_submit(
                 AppUser.is_active.is_(True),
             )
         )
+        if not user:
+            # ユーザー有無で応答時間が変わらないよう、ダミーのハッシュで同じ照合を行う
+            verify_password(password, _dummy_password_hash())
         if not user or not verify_password(password, user.password_hash):
             context = {
                 "request": request,
@@ -1076,8 +1342,12 @@ def login_submit(
                 "error": "ユーザー名またはパスワードが正しくありません。",
             }
             return templates.TemplateResponse("login.html", context, status_code=401)
+        user_id = user.id
+        if password_needs_rehash(user.password_hash):
+            user.password_hash = hash_password(password)
+            db.commit()
 
-    request.session[SESSION_USER_ID_KEY] = user.id
+    request.session[SESSION_USER_ID_KEY] = user_id
     return RedirectResponse(url=normalized_next, status_code=303)
 
 
@@ -1087,20 +1357,26 @@ def logout(request: Request) -> RedirectResponse:
     return RedirectResponse(url=LOGIN_ROUTE_PATH, status_code=303)
 
 def calculate_status(snapshot: InventorySnapshot) -> Tuple[str, str, str]:
-    if snapshot.reorder_point <= 0:
+    return _calculate_status(snapshot.on_hand, snapshot.reorder_point)
+
+
+@functools.lru_cache(maxsize=2048)
+def _calculate_status(on_hand: int, reorder_point: int) -> Tuple[str, str, str]:
+    # 在庫数と発注点だけで決まるため、同じ組み合わせは結果のタプルを使い回す
+    if reorder_point <= 0:
         return (
             '正常',
             'bg-emerald-50 text-emerald-700 border-emerald-100',
             '発注点が未設定です',
         )
-    if snapshot.on_hand <= snapshot.reorder_point:
+    if on_hand <= reorder_point:
         return (
             '不足',
             'bg-red-50 text-red-600 border-red-100',
             '至急発注が必要です',
         )
-    buffer = max(5, snapshot.reorder_point // 2)
-    if snapshot.on_hand <= snapshot.reorder_point + buffer:
+    buffer = max(5, reorder_point // 2)
+    if on_hand <= reorder_point + buffer:
         return (
             '注意',
             'bg-amber-50 text-amber-600 border-amber-100',
@@ -1112,11 +1388,28 @@ def calculate_status(snapshot: InventorySnapshot) -> Tuple[str, str, str]:
         '在庫は安定しています',
     )
 
+def summarize_inventory(
+    snapshots: Sequence[InventorySnapshot],
+) -> Tuple[int, int, int, Dict[int, Tuple[str, str, str]]]:
+    """1回の走査で (品目数, 注意対象数, 在庫不足数, item_id→状態) を求める。"""
+    attention = 0
+    low_stock = 0
+    status_by_id: Dict[int, Tuple[str, str, str]] = {}
+    for snapshot in snapshots:
+        status = calculate_status(snapshot)
+        status_by_id[snapshot.item_id] = status
+        if status[0] != '正常':
+            attention += 1
+        if snapshot.on_hand <= snapshot.reorder_point:
+            low_stock += 1
+    return len(snapshots), attention, low_stock, status_by_id
+
 def build_inventory_row(
     snapshot: InventorySnapshot,
     order_map: Optional[Dict[int, Tuple[str, str]]] = None,
+    status: Optional[Tuple[str, str, str]] = None,
 ) -> Dict[str, Any]:
-    label, badge, description = calculate_status(snapshot)
+    label, badge, description = status or calculate_status(snapshot)
     gap = snapshot.on_hand - snapshot.reorder_point
     order_status_display = ""
     order_due_display = ""
@@ -1125,8 +1418,8 @@ def build_inventory_row(
     return {
         'item_code': snapshot.item_code,
         'name': snapshot.name,
-        'item_type': display_value(snapshot.item_type),
-        'usage': display_value(snapshot.usage),
+        'item_type': snapshot.item_type,
+        'usage': snapshot.usage,
         'department': snapshot.department,
         'manufacturer': snapshot.manufacturer,
         'shelf': snapshot.shelf,
@@ -1148,126 +1441,126 @@ def build_inventory_row(
         'order_due_display': order_due_display,
     }
 
-def _department_sort_key(dept_name: str) -> Tuple[int, str]:
-    """用途ツリー・発注サイドバーの部署並び順。usage_order の順を優先し、それ以外は名前順。"""
-    idx = DEPARTMENT_ORDER_INDEX.get(dept_name)
-    if idx is not None:
-        return (0, idx)
-    return (1, dept_name or "")
+def _order_known_first(
+    names: Collection[str],
+    known_order: Sequence[str],
+    order_index: Mapping[str, int],
+) -> List[str]:
+    """names を known_order に載っている順に並べ、載っていないものを名前順で後ろに付ける。
+
+    並び順の索引によるソートと同じ結果になるが、既知の名前は順序どおりに拾うだけで比較ソートしない。
+    """
+    ordered = [name for name in known_order if name in names]
+    if len(ordered) < len(names):
+        ordered.extend(sorted(name for name in names if name not in order_index))
+    return ordered
 
 
 def get_all_departments_for_sidebar(
-    snapshots: List[InventorySnapshot],
+    snapshots: Sequence[InventorySnapshot],
     order_contacts_by_department: Optional[Dict[str, List[str]]] = None,
 ) -> List[str]:
     """用途ツリー・発注サイドバーに表示する「全部署」リスト。usage_order・email_settings・在庫の部署をマージする。"""
     from_snapshots = {s.department for s in snapshots if s.department}
     from_contacts = set((order_contacts_by_department or {}).keys())
     all_set = set(DEPARTMENT_ORDER) | from_contacts | from_snapshots
-    return sorted(all_set, key=_department_sort_key)
+    return _order_known_first(all_set, DEPARTMENT_ORDER_SEQUENCE, DEPARTMENT_ORDER_INDEX)
 
 
 def build_sidebar_structure(
-    snapshots: List[InventorySnapshot],
+    snapshots: Sequence[InventorySnapshot],
     all_departments: Optional[List[str]] = None,
 ) -> List[Dict[str, List[Dict[str, int]]]]:
     """部署別の用途・カテゴリ一覧を組み立てる。all_departments を渡すとその全部署を表示し、在庫のない部署は用途を usage_order から取得して件数 0 で表示する。"""
     structure: Dict[str, Dict[str, int]] = {}
     for snapshot in snapshots:
         department = snapshot.department
-        usage = display_value(snapshot.usage)
+        usage = snapshot.usage
         if department not in structure:
             structure[department] = {}
         structure[department][usage] = structure[department].get(usage, 0) + 1
 
-    def usage_key(dept_name: str, usage_name: str) -> Tuple[int, str]:
-        order_map = USAGE_ORDER.get(dept_name, {})
-        idx = order_map.get(usage_name)
-        if idx is not None:
-            return (0, idx)
-        return (1, usage_name or "")
+    def ordered_categories(dept_name: str, counts: Dict[str, int], usages: Collection[str]) -> List[Dict[str, int]]:
+        ordered_usages = _order_known_first(usages, USAGE_ORDER_SEQUENCE.get(dept_name, ()), USAGE_ORDER.get(dept_name, {}))
+        return [{"name": u, "count": counts.get(u, 0)} for u in ordered_usages]
 
     if all_departments is not None:
         # 全部署を表示。在庫のない部署は USAGE_ORDER の用途を件数 0 で表示
         result: List[Dict[str, List[Dict[str, int]]]] = []
         for department in all_departments:
             categories_from_snap = structure.get(department, {})
-            usage_order_for_dept = USAGE_ORDER.get(department, {})
-            all_usages = set(categories_from_snap.keys()) | set(usage_order_for_dept.keys())
-            ordered_categories = sorted(
-                [(u, categories_from_snap.get(u, 0)) for u in all_usages],
-                key=lambda kv: usage_key(department, kv[0]),
-            )
+            all_usages = categories_from_snap.keys() | USAGE_ORDER.get(department, {}).keys()
             result.append(
                 {
                     "name": department,
-                    "categories": [{"name": u, "count": c} for u, c in ordered_categories],
+                    "categories": ordered_categories(department, categories_from_snap, all_usages),
                 }
             )
         return result
 
     # 従来どおり: 在庫に登場する部署のみ
-    sorted_departments = sorted(structure.items(), key=lambda kv: _department_sort_key(kv[0]))
     result = []
-    for department, categories in sorted_departments:
-        ordered_categories = sorted(categories.items(), key=lambda kv: usage_key(department, kv[0]))
+    for department in _order_known_first(structure, DEPARTMENT_ORDER_SEQUENCE, DEPARTMENT_ORDER_INDEX):
+        categories = structure[department]
         result.append(
             {
                 "name": department,
-                "categories": [{"name": usage, "count": count} for usage, count in ordered_categories],
+                "categories": ordered_categories(department, categories, categories),
             }
         )
     return result
 
 
-def build_category_options(snapshots: List[InventorySnapshot]) -> List[str]:
-    return sorted({display_value(snapshot.item_type) for snapshot in snapshots})
-
-
-def build_type_options(
-    snapshots: List[InventorySnapshot], usage: str, department: str
-) -> List[str]:
-    relevant_snapshots = snapshots
+def build_type_options(index: "InventoryFilterIndex", usage: str, department: str) -> Tuple[List[str], List[str]]:
+    """(全種別, 用途・部署で絞り込んだ種別) を返す。種別ごとの位置集合を使い、スナップショットは走査しない。"""
+    category_options = sorted(index.by_type)
+    selected: List[FrozenSet[int]] = []
     if department:
-        relevant_snapshots = [
-            snapshot for snapshot in snapshots if snapshot.department == department
-        ]
+        selected.append(index.by_department.get(department, frozenset()))
     if usage:
-        candidates = [
-            display_value(snapshot.item_type)
-            for snapshot in relevant_snapshots
-            if display_value(snapshot.usage) == usage
-        ]
+        selected.append(index.by_usage.get(usage, frozenset()))
+    if selected:
+        positions = frozenset.intersection(*selected)
+        unique = sorted(
+            item_type for item_type, item_positions in index.by_type.items()
+            if not item_positions.isdisjoint(positions)
+        )
     else:
-        candidates = [display_value(snapshot.item_type) for snapshot in relevant_snapshots]
-    unique = sorted(set(candidates))
+        unique = category_options
+    dept_key = department or ""
+    usage_key = usage or ""
     def type_key(value: str) -> Tuple[int, str]:
-        order_map = TYPE_ORDER.get(department or "", {}).get(usage or "", {})
-        idx = order_map.get(value)
+        idx = TYPE_ORDER_FLAT.get((dept_key, usage_key, value))
         if idx is not None:
             return (0, idx)
         return (1, value)
-    return sorted(unique, key=type_key)
+    return category_options, sorted(unique, key=type_key)
 
 
-def describe_transaction(tx: Optional[InventoryTransaction]) -> Tuple[str, datetime, str]:
+# TransactionType は str の Enum のため、DB から生の文字列で読んだ種別でもそのまま引ける
+TX_TYPE_LABELS = {
+    TransactionType.RECEIPT: "入庫",
+    TransactionType.ISSUE: "出庫",
+    TransactionType.ADJUST: "調整",
+}
+
+
+def describe_transaction(tx: Optional[InventoryTransaction], now: Optional[datetime] = None) -> Tuple[str, str, datetime, str]:
+    """(種別ラベル, 表示用サマリ, 発生日時, 仕入先/備考) を返す。
+
+    履歴がない場合の発生日時は現在時刻。まとめて呼ぶ側は取得済みの now を渡すと1件ごとに時刻を取得しない。
+    """
     if not tx:
-        return "履歴なし", to_jst(None), ""
-    label_map = {
-        TransactionType.RECEIPT: "入庫",
-        TransactionType.ISSUE: "出庫",
-        TransactionType.ADJUST: "調整",
-    }
-    label = label_map.get(tx.tx_type, tx.tx_type.value if isinstance(tx.tx_type, TransactionType) else str(tx.tx_type))
-    details = [label]
-    if tx.note:
-        details.append(tx.note)
-    elif tx.reason:
-        details.append(tx.reason)
-    summary = "・".join(details)
+        return "履歴なし", "履歴なし", now if now is not None else now_jst(), ""
+    tx_type = tx.tx_type
+    label = TX_TYPE_LABELS.get(tx_type)
+    if label is None:
+        label = tx_type.value if isinstance(tx_type, TransactionType) else str(tx_type)
     occurred = to_jst(tx.occurred_at or tx.created_at)
-    supplier = tx.note or tx.reason or ""
-    return summary, occurred, supplier
+    detail = tx.note or tx.reason
+    if not detail:
+        return label, label, occurred, ""
+    return label, f"{label}・{detail}", occurred, detail
 
 
 def count_low_stock_by_department(suggestions: List[Dict[str, object]]) -> Dict[str, int]:
@@ -1316,7 +1609,7 @@ def build_orders_url(department: str = "") -> str:
         params.append(('department', final_department))
     if not params:
         return '/orders'
-    return '/orders?' + '&'.join(f'{name}={quote_plus(value)}' for name, value in params)
+    return '/orders?' + urlencode(params, quote_via=quote_plus)
 
 
 def build_inventory_status_payload(
@@ -1325,7 +1618,7 @@ def build_inventory_status_payload(
     last_tx: Optional[InventoryTransaction],
     db: Optional[Session] = None,
 ) -> Dict[str, object]:
-    last_activity, last_updated, last_supplier = describe_transaction(last_tx)
+    _, last_activity, last_updated, last_supplier = describe_transaction(last_tx)
     supplier_label = (
         item.supplier.name if item.supplier else last_supplier or normalize_field(item.manufacturer)
     )
@@ -1371,49 +1664,266 @@ def build_inventory_status_payload(
     }
 
 
+def latest_transaction_subquery(item_ids_stmt: Any) -> Any:
+    """item_ids_stmt が返す各品目の取引に、品目内の新しい順（occurred_at 降順）の順位 rn を付けたサブクエリ。
+
+    rn == 1 で結合すれば全履歴を読み込まずに品目あたり最新の1行だけを取得できる。
+    """
+    return (
+        select(
+            InventoryTransaction.id.label("tx_id"),
+            InventoryTransaction.item_id,
+            InventoryTransaction.tx_type,
+            InventoryTransaction.note,
+            InventoryTransaction.reason,
+            InventoryTransaction.occurred_at,
+            InventoryTransaction.created_at,
+            func.row_number()
+            .over(
+                partition_by=InventoryTransaction.item_id,
+                order_by=(InventoryTransaction.occurred_at.desc(), InventoryTransaction.id.desc()),
+            )
+            .label("rn"),
+        )
+        .where(InventoryTransaction.item_id.in_(item_ids_stmt))
+        .subquery()
+    )
+
+
+@dataclass(frozen=True)
+class InventoryFilterIndex:
+    """在庫一覧の絞り込み用に、種別・用途・部署ごとのスナップショット位置を持つ転置インデックス。
+
+    summary には summarize_inventory の結果（品目数・注意対象数・在庫不足数・状態）を持ち、KPI をリクエストごとに数え直さない。
+    """
+    # 棚番順（shelf_sort_key）に並べ替え済み。絞り込み結果もこの順で返る
+    snapshots: Tuple[InventorySnapshot, ...]
+    by_type: Dict[str, FrozenSet[int]]
+    by_usage: Dict[str, FrozenSet[int]]
+    by_department: Dict[str, FrozenSet[int]]
+    summary: Tuple[int, int, int, Dict[int, Tuple[str, str, str]]]
+
+
+def build_inventory_filter_index(snapshots: Sequence[InventorySnapshot]) -> InventoryFilterIndex:
+    by_type: Dict[str, Set[int]] = {}
+    by_usage: Dict[str, Set[int]] = {}
+    by_department: Dict[str, Set[int]] = {}
+    ordered = sorted(snapshots, key=shelf_sort_key)
+    for position, snapshot in enumerate(ordered):
+        by_type.setdefault(snapshot.item_type, set()).add(position)
+        by_usage.setdefault(snapshot.usage, set()).add(position)
+        by_department.setdefault(snapshot.department, set()).add(position)
+    return InventoryFilterIndex(
+        snapshots=tuple(ordered),
+        by_type={key: frozenset(value) for key, value in by_type.items()},
+        by_usage={key: frozenset(value) for key, value in by_usage.items()},
+        by_department={key: frozenset(value) for key, value in by_department.items()},
+        summary=summarize_inventory(ordered),
+    )
+
+
+@functools.cache
+def sample_inventory_filter_index() -> InventoryFilterIndex:
+    return build_inventory_filter_index(sample_inventory())
+
+
+@dataclass
+class _InventoryCacheEntry:
+    generation: int
+    loaded_at: float
+    snapshots: List[InventorySnapshot]
+    # 在庫一覧画面で初めて必要になった時点で作る
+    filter_index: Optional[InventoryFilterIndex] = None
+
+
+# 在庫スナップショットのプロセス内キャッシュ。
+# 同一プロセスでの在庫関連テーブルへの書き込みは Session のイベントで検知して即時に破棄し、
+# 別プロセス（他ワーカー・取込スクリプト）からの更新は TTL 経過で反映する。
+INVENTORY_CACHE_TTL_SECONDS = 30.0
+_INVENTORY_CACHE_TABLES = frozenset({"items", "inventory_items", "inventory_transactions", "suppliers"})
+_INVENTORY_DIRTY_KEY = "inventory_cache_dirty"
+_inventory_cache_lock = threading.Lock()
+_inventory_cache_generation = 0
+_inventory_cache_entry: Optional["_InventoryCacheEntry"] = None
+
+
+def invalidate_inventory_cache() -> None:
+    global _inventory_cache_generation
+    with _inventory_cache_lock:
+        _inventory_cache_generation += 1
+
+
+def _touches_inventory_tables(objects: Any) -> bool:
+    for obj in objects:
+        table = getattr(obj, "__table__", None)
+        if table is not None and table.name in _INVENTORY_CACHE_TABLES:
+            return True
+    return False
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_inventory_cache_dirty_on_flush(session: Session, flush_context: Any) -> None:
+    if _touches_inventory_tables(session.new) or _touches_inventory_tables(session.dirty) or _touches_inventory_tables(session.deleted):
+        session.info[_INVENTORY_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_inventory_cache_dirty_on_bulk(orm_execute_state: Any) -> None:
+    # update()/delete() 文は flush を経由しないためここで検知する
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and getattr(table, "name", None) in _INVENTORY_CACHE_TABLES:
+        orm_execute_state.session.info[_INVENTORY_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_inventory_cache_on_commit(session: Session) -> None:
+    if session.info.pop(_INVENTORY_DIRTY_KEY, False):
+        invalidate_inventory_cache()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_inventory_cache_mark(session: Session) -> None:
+    session.info.pop(_INVENTORY_DIRTY_KEY, None)
+
+
+def _load_inventory_cache_entry(db: Session) -> _InventoryCacheEntry:
+    global _inventory_cache_entry
+    with _inventory_cache_lock:
+        generation = _inventory_cache_generation
+        cached = _inventory_cache_entry
+    now = time.monotonic()
+    if cached is not None and cached.generation == generation and now - cached.loaded_at < INVENTORY_CACHE_TTL_SECONDS:
+        return cached
+    entry = _InventoryCacheEntry(generation, now, _query_inventory_snapshots(db))
+    with _inventory_cache_lock:
+        # 読み込み中に書き込みがあった場合は古い世代として保存され、次回は再取得される
+        _inventory_cache_entry = entry
+    return entry
+
+
 def load_inventory_snapshots(db: Session) -> List[InventorySnapshot]:
+    return list(_load_inventory_cache_entry(db).snapshots)
+
+
+# ETag をワーカー（プロセス）ごとに区別するための識別子
+_INVENTORY_ETAG_PROCESS_TAG = os.urandom(4).hex()
+
+
+def inventory_etag() -> str:
+    """在庫関連データの版を表す弱い ETag。
+
+    同一プロセスの書き込みで世代が進むと変わる。別プロセスからの更新はキャッシュと同じく TTL 単位で反映する。
+    """
+    with _inventory_cache_lock:
+        generation = _inventory_cache_generation
+    ttl_bucket = int(time.monotonic() // INVENTORY_CACHE_TTL_SECONDS)
+    return f'W/"{_INVENTORY_ETAG_PROCESS_TAG}-{generation}-{ttl_bucket}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {value.strip() for value in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def load_inventory_filter_index(db: Session) -> InventoryFilterIndex:
+    entry = _load_inventory_cache_entry(db)
+    if entry.filter_index is None:
+        entry.filter_index = build_inventory_filter_index(entry.snapshots)
+    return entry.filter_index
+
+
+# (在庫インデックス, 部署別発注担当者, (全部署, 用途ツリー)) の直近1件。代入は1回で行うためロック不要
+_sidebar_cache: Optional[
+    Tuple[InventoryFilterIndex, Dict[str, List[str]], Tuple[List[str], List[Dict[str, List[Dict[str, int]]]]]]
+] = None
+
+
+def load_sidebar(
+    filter_index: InventoryFilterIndex,
+    order_contacts_by_department: Dict[str, List[str]],
+) -> Tuple[List[str], List[Dict[str, List[Dict[str, int]]]]]:
+    """全部署リストと用途ツリーを返す。在庫キャッシュと email_settings が前回と同じオブジェクトなら組み立て直さない（呼び出し側で変更しないこと）。"""
+    global _sidebar_cache
+    cached = _sidebar_cache
+    if cached is not None and cached[0] is filter_index and cached[1] is order_contacts_by_department:
+        return cached[2]
+    all_departments = get_all_departments_for_sidebar(filter_index.snapshots, order_contacts_by_department)
+    sidebar = (all_departments, build_sidebar_structure(filter_index.snapshots, all_departments=all_departments))
+    _sidebar_cache = (filter_index, order_contacts_by_department, sidebar)
+    return sidebar
+
+
+INVENTORY_SNAPSHOT_BATCH_SIZE = 256
+
+
+def _query_inventory_snapshots(db: Session) -> List[InventorySnapshot]:
     # 在庫一覧には管理対象のみ表示する
+    managed_filter = or_(Item.management_type == "管理", Item.management_type.is_(None))
+    latest_tx = latest_transaction_subquery(select(Item.id).where(managed_filter))
+    # ORM オブジェクトを作らず、スナップショットに必要な列と最新取引だけを1回のクエリで行として取得する
     stmt = (
-        select(Item)
-        .where(or_(Item.management_type == "管理", Item.management_type.is_(None)))
-        .options(selectinload(Item.inventory_item))
-        .options(selectinload(Item.inventory_transactions))
-        .options(selectinload(Item.supplier))
+        select(
+            Item.id,
+            Item.item_code,
+            Item.name,
+            Item.item_type,
+            Item.usage,
+            Item.department,
+            Item.manufacturer,
+            Item.shelf,
+            Item.unit,
+            Item.reorder_point,
+            InventoryItem.quantity_on_hand,
+            Supplier.name.label("supplier_name"),
+            latest_tx.c.tx_id,
+            latest_tx.c.tx_type,
+            latest_tx.c.note,
+            latest_tx.c.reason,
+            latest_tx.c.occurred_at,
+            latest_tx.c.created_at,
+        )
+        .outerjoin(InventoryItem, InventoryItem.item_id == Item.id)
+        .outerjoin(Supplier, Supplier.id == Item.supplier_id)
+        .outerjoin(latest_tx, and_(latest_tx.c.item_id == Item.id, latest_tx.c.rn == 1))
+        .where(managed_filter)
         .order_by(
             Item.shelf.asc().nullsfirst(),
             Item.item_code.asc(),
         )
     )
-    items = db.scalars(stmt).all()
     snapshots: List[InventorySnapshot] = []
-    for item in items:
-        inventory = item.inventory_item
-        on_hand = inventory.quantity_on_hand if inventory else 0
-        last_tx = item.inventory_transactions[0] if item.inventory_transactions else None
-        last_activity, last_updated, last_tx_supplier = describe_transaction(last_tx)
-        item_type_value = display_value(item.item_type)
-        usage_value = display_value(item.usage)
-        department_value = display_value(item.department)
-        shelf_value = normalize_field(item.shelf)
-        manufacturer_value = normalize_field(item.manufacturer)
+    # 履歴のない品目の最終更新日時はこの1回分の現在時刻で揃える
+    now = now_jst()
+    # 全行を一度に保持しないよう、一定件数ずつ読み込みながらスナップショットに変換する
+    for row in db.execute(stmt.execution_options(yield_per=INVENTORY_SNAPSHOT_BATCH_SIZE)):
+        _, last_activity, last_updated, last_tx_supplier = describe_transaction(
+            row if row.tx_id is not None else None, now
+        )
+        shelf_value = normalize_field(row.shelf)
+        manufacturer_value = normalize_field(row.manufacturer)
         supplier_label = (
-            item.supplier.name
-            if item.supplier
+            row.supplier_name
+            if row.supplier_name is not None
             else last_tx_supplier or manufacturer_value
         )
         snapshots.append(
             InventorySnapshot(
-                item_id=item.id,
-                item_code=item.item_code,
-                name=item.name,
-                item_type=item_type_value,
-                usage=usage_value,
-                department=department_value,
+                item_id=row.id,
+                item_code=row.item_code,
+                name=row.name,
+                item_type=display_value(row.item_type),
+                usage=display_value(row.usage),
+                department=display_value(row.department),
                 manufacturer=manufacturer_value,
                 shelf=shelf_value or None,
-                unit=item.unit or "",
-                on_hand=on_hand,
-                reorder_point=item.reorder_point or 0,
+                unit=row.unit or "",
+                on_hand=row.quantity_on_hand if row.quantity_on_hand is not None else 0,
+                reorder_point=row.reorder_point or 0,
                 last_activity=last_activity,
                 last_updated=last_updated,
                 location=shelf_value,
@@ -1424,26 +1934,41 @@ def load_inventory_snapshots(db: Session) -> List[InventorySnapshot]:
 
 
 def load_recent_transactions(db: Session, limit: int = 4) -> List[Dict[str, str]]:
+    # 表示に使う列だけを行タプルで取得する（ORM オブジェクトを組み立てない）。
+    # 取引側の列名は InventoryTransaction と同じにし、describe_transaction にそのまま渡す
     stmt = (
-        select(InventoryTransaction)
+        select(
+            InventoryTransaction.tx_type,
+            InventoryTransaction.delta,
+            InventoryTransaction.note,
+            InventoryTransaction.reason,
+            InventoryTransaction.occurred_at,
+            InventoryTransaction.created_at,
+            Item.name.label("item_name"),
+            Item.department.label("item_department"),
+            Item.shelf.label("item_shelf"),
+            Item.item_code.label("item_code"),
+            Item.manufacturer.label("item_manufacturer"),
+            Item.unit.label("item_unit"),
+        )
+        .outerjoin(Item, Item.id == InventoryTransaction.item_id)
         .order_by(InventoryTransaction.occurred_at.desc())
         .limit(limit)
-        .options(selectinload(InventoryTransaction.item))
     )
-    txs = db.scalars(stmt).all()
     recent: List[Dict[str, str]] = []
-    for tx in txs:
-        summary, occurred_at, _ = describe_transaction(tx)
+    for tx in db.execute(stmt):
+        label, summary, occurred_at, _ = describe_transaction(tx)
+        has_item = tx.item_name is not None
         recent.append(
             {
-                "item": tx.item.name if tx.item else "荳肴・蜩∫岼",
-                "department": tx.item.department if tx.item and tx.item.department else "譛ｪ險ｭ螳夐Κ鄂ｲ",
-                "type": summary.split("繝ｻ")[0] if summary else "",
-                "shelf": tx.item.shelf if tx.item else "",
-                "item_code": tx.item.item_code if tx.item else "",
-                "manufacturer": tx.item.manufacturer if tx.item else "",
+                "item": tx.item_name if has_item else "荳肴・蜩∫岼",
+                "department": tx.item_department if has_item and tx.item_department else "譛ｪ險ｭ螳夐Κ鄂ｲ",
+                "type": label,
+                "shelf": tx.item_shelf if has_item else "",
+                "item_code": tx.item_code if has_item else "",
+                "manufacturer": tx.item_manufacturer if has_item else "",
                 "summary": summary,
-                "delta": f"{'+' if tx.delta >= 0 else ''}{tx.delta} {tx.item.unit if tx.item and tx.item.unit else ''}".strip(),
+                "delta": f"{'+' if tx.delta >= 0 else ''}{tx.delta} {tx.item_unit if has_item and tx.item_unit else ''}".strip(),
                 "date": occurred_at.strftime("%Y/%m/%d %H:%M"),
                 "note": tx.note or tx.reason or "",
             }
@@ -1451,29 +1976,27 @@ def load_recent_transactions(db: Session, limit: int = 4) -> List[Dict[str, str]
     return recent
 
 
-def count_today_movement_transactions(db: Session) -> Dict[str, int]:
-    now = datetime.now(JST_ZONE)
-    today = now.date()
+def count_today_movement_transactions(db: Session, today: Optional[date] = None) -> Dict[str, int]:
+    if today is None:
+        today = now_jst().date()
+    # occurred_at は JST の壁時計時刻で保存されるため、JST の日付境界（タイムゾーンなし）で範囲指定して SQL 側で数える
+    day_start = datetime.combine(today, datetime.min.time())
     stmt = (
-        select(InventoryTransaction)
-        .order_by(InventoryTransaction.occurred_at.desc())
-        .limit(1000)
+        select(InventoryTransaction.tx_type, func.count())
+        .where(InventoryTransaction.occurred_at >= day_start)
+        .where(InventoryTransaction.occurred_at < day_start + timedelta(days=1))
+        .group_by(InventoryTransaction.tx_type)
     )
-    txs = db.scalars(stmt).all()
     receipt_count = 0
     issue_count = 0
     adjust_count = 0
-    for tx in txs:
-        occurred_day = to_jst(tx.occurred_at).date()
-        if occurred_day != today:
-            continue
-        tx_type = tx.tx_type.value if isinstance(tx.tx_type, TransactionType) else str(tx.tx_type)
-        if tx_type == TransactionType.RECEIPT.value:
-            receipt_count += 1
-        elif tx_type == TransactionType.ISSUE.value:
-            issue_count += 1
+    for tx_type, count in db.execute(stmt):
+        if tx_type == TransactionType.RECEIPT:
+            receipt_count += count
+        elif tx_type == TransactionType.ISSUE:
+            issue_count += count
         else:
-            adjust_count += 1
+            adjust_count += count
     return {
         "receipt_count": receipt_count,
         "issue_count": issue_count,
@@ -1481,21 +2004,73 @@ def count_today_movement_transactions(db: Session) -> Dict[str, int]:
     }
 
 
-def load_pending_receipt_orders(db: Session, limit: int = 100) -> List[Dict[str, Any]]:
-    service = get_purchase_order_service(db)
-    orders = service.list_orders()
-    pending_statuses = {PurchaseOrderStatus.SENT.value, PurchaseOrderStatus.WAITING.value}
-    pending = [order for order in orders if str(order.get("status") or "") in pending_statuses]
-    pending.sort(key=lambda row: int(row.get("id") or 0), reverse=True)
-    if limit > 0:
-        pending = pending[:limit]
-    for order in pending:
-        lines = order.get("lines") or []
-        order["line_count"] = len(lines)
-        order["total_quantity"] = sum(int(line.get("quantity") or 0) for line in lines)
-        order["received_quantity_total"] = sum(int(line.get("received_quantity") or 0) for line in lines)
-        order["remaining_quantity_total"] = sum(int(line.get("remaining_quantity") or 0) for line in lines)
-    return pending
+PENDING_RECEIPT_STATUSES: Tuple[str, ...] = (PurchaseOrderStatus.SENT.value, PurchaseOrderStatus.WAITING.value)
+
+
+def load_pending_receipt_summaries(db: Session) -> List[Dict[str, Any]]:
+    """入荷待ちの発注を新しい順に返す（明細は読み込まず、明細数・数量の合計を SQL で集計する）。"""
+    received = func.coalesce(PurchaseOrderLine.received_quantity, 0)
+    remaining = case((PurchaseOrderLine.quantity > received, PurchaseOrderLine.quantity - received), else_=0)
+    stmt = (
+        select(
+            PurchaseOrder.id,
+            PurchaseOrder.status,
+            PurchaseOrder.department,
+            PurchaseOrder.ordered_by_user,
+            Supplier.name,
+            func.count(PurchaseOrderLine.id),
+            func.coalesce(func.sum(PurchaseOrderLine.quantity), 0),
+            func.coalesce(func.sum(case((received > 0, received), else_=0)), 0),
+            func.coalesce(func.sum(remaining), 0),
+        )
+        .outerjoin(Supplier, Supplier.id == PurchaseOrder.supplier_id)
+        .outerjoin(PurchaseOrderLine, PurchaseOrderLine.purchase_order_id == PurchaseOrder.id)
+        .where(PurchaseOrder.status.in_(PENDING_RECEIPT_STATUSES))
+        .group_by(PurchaseOrder.id)
+        .order_by(PurchaseOrder.id.desc())
+    )
+    return [
+        {
+            "id": order_id,
+            "status": status,
+            "department": department or "",
+            "ordered_by_user": ordered_by_user or "",
+            "supplier_name": supplier_name or "",
+            "line_count": line_count,
+            "total_quantity": total_quantity,
+            "received_quantity_total": received_total,
+            "remaining_quantity_total": remaining_total,
+        }
+        for (
+            order_id,
+            status,
+            department,
+            ordered_by_user,
+            supplier_name,
+            line_count,
+            total_quantity,
+            received_total,
+            remaining_total,
+        ) in db.execute(stmt)
+    ]
+
+
+def attach_pending_receipt_lines(db: Session, orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """load_pending_receipt_summaries の行に入庫入力用の明細（lines）を付ける。明細は渡された発注の分だけを1回で取得する。"""
+    lines_by_order = get_purchase_order_service(db).list_lines_by_order([order["id"] for order in orders])
+    for order in orders:
+        order["lines"] = lines_by_order.get(order["id"], [])
+    return orders
+
+
+def count_orders_by_status(db: Session) -> Dict[str, int]:
+    """取消以外の発注件数をステータス別に SQL で集計する（発注・明細は読み込まない）。"""
+    stmt = (
+        select(PurchaseOrder.status, func.count(PurchaseOrder.id))
+        .where(PurchaseOrder.status != PurchaseOrderStatus.CANCELLED.value)
+        .group_by(PurchaseOrder.status)
+    )
+    return {str(status or ""): int(count) for status, count in db.execute(stmt)}
 
 
 def load_recent_adjustment_transactions(db: Session, limit: int = 20) -> List[Dict[str, str]]:
@@ -1504,7 +2079,7 @@ def load_recent_adjustment_transactions(db: Session, limit: int = 20) -> List[Di
         .filter(InventoryTransaction.tx_type == TransactionType.ADJUST)
         .order_by(InventoryTransaction.occurred_at.desc())
         .limit(limit)
-        .options(selectinload(InventoryTransaction.item))
+        .options(joinedload(InventoryTransaction.item))
     )
     txs = db.scalars(stmt).all()
     rows: List[Dict[str, str]] = []
@@ -1528,17 +2103,27 @@ def load_recent_adjustment_transactions(db: Session, limit: int = 20) -> List[Di
 
 @app.get("/recent-transactions")
 def recent_transactions(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db_ro),
     limit: int = Query(4, ge=1, le=20),
     current_user: Optional[Dict[str, Any]] = Depends(get_optional_user),
 ) -> Dict[str, List[Dict[str, str]]]:
-    """直近トランザクション。未ログインでも取得可能（一般ユーザー向けダッシュボード・在庫で利用）。DBの実データのみ返す。"""
+    """直近トランザクション。未ログインでも取得可能（一般ユーザー向けダッシュボード・在庫で利用）。DBの実データのみ返す。
+
+    画面から定期取得されるため ETag を付け、在庫に変更がなければ 304 を返す。
+    """
+    etag = inventory_etag()
+    cache_headers = {"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers)
+    response.headers.update(cache_headers)
     transactions = load_recent_transactions(db, limit)
     return {"transactions": transactions}
 
 
 def filter_inventory(
-    snapshots: List[InventorySnapshot],
+    index: InventoryFilterIndex,
     keyword: str,
     category: str,
     usage: str,
@@ -1548,29 +2133,22 @@ def filter_inventory(
     normalized_category = normalize_field(category)
     normalized_usage = normalize_field(usage)
     normalized_department = normalize_field(department)
-    result: List[InventorySnapshot] = []
-    for snapshot in snapshots:
-        snapshot_type = display_value(snapshot.item_type)
-        snapshot_usage = display_value(snapshot.usage)
-        snapshot_department = normalize_field(snapshot.department)
-        if normalized_category and snapshot_type != normalized_category:
-            continue
-        if normalized_usage and snapshot_usage != normalized_usage:
-            continue
-        if normalized_department and snapshot_department != normalized_department:
-            continue
-        if normalized_keyword:
-            haystack = ' '.join([
-                snapshot.item_code,
-                snapshot.name,
-                snapshot_type,
-                snapshot_usage,
-                snapshot_department,
-            ]).lower()
-            if normalized_keyword not in haystack:
-                continue
-        result.append(snapshot)
-    return result
+    selected: List[FrozenSet[int]] = []
+    if normalized_category:
+        selected.append(index.by_type.get(normalized_category, frozenset()))
+    if normalized_usage:
+        selected.append(index.by_usage.get(normalized_usage, frozenset()))
+    if normalized_department:
+        selected.append(index.by_department.get(normalized_department, frozenset()))
+    if selected:
+        # 元の並び順を保つため位置の昇順で取り出す
+        positions = sorted(frozenset.intersection(*selected))
+        candidates: Sequence[InventorySnapshot] = [index.snapshots[position] for position in positions]
+    else:
+        candidates = index.snapshots
+    if not normalized_keyword:
+        return list(candidates)
+    return [snapshot for snapshot in candidates if normalized_keyword in snapshot.search_haystack]
 
 
 def build_inventory_url(
@@ -1600,7 +2178,7 @@ def build_inventory_url(
         params.append(('department', final_department))
     if not params:
         return '/inventory'
-    return '/inventory?' + '&'.join(f'{name}={quote_plus(value)}' for name, value in params)
+    return '/inventory?' + urlencode(params, quote_via=quote_plus)
 
 @app.get('/', include_in_schema=False)
 def root() -> RedirectResponse:
@@ -1610,12 +2188,12 @@ def root() -> RedirectResponse:
 @app.get('/dashboard', response_class=HTMLResponse)
 def dashboard_page(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     current_user: Optional[Dict[str, Any]] = Depends(get_optional_user),
 ) -> HTMLResponse:
     snapshots = load_inventory_snapshots(db)
     if not snapshots:
-        snapshots = SAMPLE_INVENTORY
+        snapshots = sample_inventory()
 
     low_stock_suggestions = load_low_stock_suggestions(db)
     if not low_stock_suggestions:
@@ -1634,8 +2212,7 @@ def dashboard_page(
         key=lambda row: (-int(row[1]), str(row[0])),
     )
 
-    service = get_purchase_order_service(db)
-    orders = service.list_orders()
+    order_counts = count_orders_by_status(db)
     status_order = [
         PurchaseOrderStatus.DRAFT.value,
         PurchaseOrderStatus.CONFIRMED.value,
@@ -1650,25 +2227,21 @@ def dashboard_page(
         PurchaseOrderStatus.WAITING.value: "入荷待ち",
         PurchaseOrderStatus.RECEIVED.value: "納品済",
     }
-    status_counts_map = {status: 0 for status in status_order}
-    for order in orders:
-        status = str(order.get("status") or "")
-        if status in status_counts_map:
-            status_counts_map[status] += 1
     order_status_cards = [
         {
             "status": status,
             "label": status_labels.get(status, status),
-            "count": status_counts_map.get(status, 0),
+            "count": order_counts.get(status, 0),
         }
         for status in status_order
     ]
 
-    pending_orders_all = load_pending_receipt_orders(db, limit=0)
+    pending_orders_all = load_pending_receipt_summaries(db)
     pending_orders_top = pending_orders_all[:6]
     pending_remaining_qty = sum(int(order.get("remaining_quantity_total") or 0) for order in pending_orders_all)
 
-    today_counts = count_today_movement_transactions(db)
+    now = now_jst()
+    today_counts = count_today_movement_transactions(db, now.date())
     movement_total = (
         int(today_counts.get("receipt_count") or 0)
         + int(today_counts.get("issue_count") or 0)
@@ -1711,13 +2284,13 @@ def dashboard_page(
         "low_stock_items": low_stock_top,
         "low_stock_by_department": low_stock_by_department[:6],
         "order_status_cards": order_status_cards,
-        "order_total_count": len(orders),
+        "order_total_count": sum(order_counts.values()),
         "pending_orders": pending_orders_top,
         "pending_order_total": len(pending_orders_all),
         "today_counts": today_counts,
         "recent_transactions": recent_transactions,
         "build_orders_url": build_orders_url,
-        "now": datetime.now(JST_ZONE),
+        "now": now,
         "current_user": current_user,
     }
     return templates.TemplateResponse('dashboard.html', context)
@@ -1730,7 +2303,7 @@ def inventory_index(
     usage: str = Query('', alias='usage'),
     department: str = Query('', alias='department'),
     message: str = Query('', alias='message'),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     current_user: Optional[Dict[str, Any]] = Depends(get_optional_user),
 ) -> HTMLResponse:
     keyword = q.strip()
@@ -1738,27 +2311,28 @@ def inventory_index(
     selected_usage = normalize_field(usage)
     selected_department = normalize_field(department)
 
-    snapshots = load_inventory_snapshots(db)
-    if not snapshots:
-        snapshots = SAMPLE_INVENTORY
+    filter_index = load_inventory_filter_index(db)
+    if not filter_index.snapshots:
+        filter_index = sample_inventory_filter_index()
     _, _, order_contacts_by_department = load_order_contacts(EMAIL_SETTINGS_PATH)
-    all_departments = get_all_departments_for_sidebar(snapshots, order_contacts_by_department)
+    _, sidebar_structure = load_sidebar(filter_index, order_contacts_by_department)
+    category_options, type_options = build_type_options(filter_index, selected_usage, selected_department)
 
     filtered_snapshots = filter_inventory(
-        snapshots,
+        filter_index,
         keyword,
         selected_category,
         selected_usage,
         selected_department,
     )
-    filtered_snapshots = sorted(filtered_snapshots, key=shelf_sort_key)
     order_map = load_item_order_status_map(db, [s.item_id for s in filtered_snapshots])
-    rows = [build_inventory_row(snapshot, order_map) for snapshot in filtered_snapshots]
-
-    total_items = len(snapshots)
-    attention_count = sum(1 for snapshot in snapshots if calculate_status(snapshot)[0] != '正常')
-    low_stock_count = sum(1 for snapshot in snapshots if snapshot.on_hand <= snapshot.reorder_point)
-    deliveries_due_today = count_deliveries_due_today(db)
+    total_items, attention_count, low_stock_count, status_by_id = filter_index.summary
+    rows = [
+        build_inventory_row(snapshot, order_map, status_by_id.get(snapshot.item_id))
+        for snapshot in filtered_snapshots
+    ]
+    now = now_jst()
+    deliveries_due_today = count_deliveries_due_today(db, now.date())
 
     kpi_cards = [
         {
@@ -1791,18 +2365,18 @@ def inventory_index(
     context = {
         'request': request,
         'nav_links': build_nav_links('/inventory', current_user),
-        'sidebar_structure': build_sidebar_structure(snapshots, all_departments=all_departments),
-        'category_options': build_category_options(snapshots),
+        'sidebar_structure': sidebar_structure,
+        'category_options': category_options,
         'selected_category': selected_category,
         'keyword': keyword,
         'selected_usage': selected_usage,
         'selected_department': selected_department,
-        'type_options': build_type_options(snapshots, selected_usage, selected_department),
+        'type_options': type_options,
         'filtered_items': rows,
         'filtered_count': len(rows),
         'total_items': total_items,
         'kpi_cards': kpi_cards,
-        'now': datetime.now(JST_ZONE),
+        'now': now,
         'build_inventory_url': build_inventory_url,
         'alert_message': alert_message,
         'current_user': current_user,
@@ -1813,7 +2387,7 @@ def inventory_index(
 @app.get('/logistics', response_class=HTMLResponse)
 def logistics_page(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     current_user: Dict[str, Any] = Depends(require_manager_user),
 ) -> HTMLResponse:
     snapshots = load_inventory_snapshots(db)
@@ -1828,15 +2402,18 @@ def logistics_page(
         }
         for snapshot in snapshots
     ]
-    pending_orders = load_pending_receipt_orders(db, limit=100)
+    # KPI は入荷待ち全件の集計値、一覧は新しい順の先頭 100 件だけに明細を読み込む
+    pending_orders_all = load_pending_receipt_summaries(db)
+    pending_orders = attach_pending_receipt_lines(db, pending_orders_all[:100])
     recent_adjustments = load_recent_adjustment_transactions(db, limit=20)
-    counts = count_today_movement_transactions(db)
-    pending_line_count = sum(int(order.get("line_count") or 0) for order in pending_orders)
-    pending_remaining_qty = sum(int(order.get("remaining_quantity_total") or 0) for order in pending_orders)
+    now = now_jst()
+    counts = count_today_movement_transactions(db, now.date())
+    pending_line_count = sum(order["line_count"] for order in pending_orders_all)
+    pending_remaining_qty = sum(order["remaining_quantity_total"] for order in pending_orders_all)
     kpi_cards = [
         {
             "label": "入庫待ち発注",
-            "value": len(pending_orders),
+            "value": len(pending_orders_all),
             "note": "発注メール送信後の待機件数",
             "icon": "local_shipping",
         },
@@ -1867,7 +2444,7 @@ def logistics_page(
         "item_options_json": json.dumps(item_options),
         "pending_orders": pending_orders,
         "recent_adjustments": recent_adjustments,
-        "now": datetime.now(JST_ZONE),
+        "now": now,
         "current_user": current_user,
     }
     return templates.TemplateResponse('logistics.html', context)
@@ -1921,6 +2498,48 @@ def receive_purchase_order_to_inventory(
     }
 
 
+def load_item_with_inventory(
+    db: Session, item_code: str
+) -> Tuple[Optional[Item], Optional[InventoryItem]]:
+    """品目コードから品目と在庫を1回のクエリ（外部結合）で取得する。"""
+    row = db.execute(
+        select(Item, InventoryItem)
+        .join(InventoryItem, InventoryItem.item_id == Item.id, isouter=True)
+        .where(Item.item_code == item_code)
+    ).first()
+    if row is None:
+        return None, None
+    return row[0], row[1]
+
+
+def apply_inventory_delta(db: Session, inventory_item: InventoryItem, delta: int) -> bool:
+    """在庫数に delta を加算する。加算後が0未満になる場合は更新せず False を返す。
+
+    読み込んだ値を書き戻さず、判定と加算を1回の UPDATE ... RETURNING で行うため、同時更新でも増減を取りこぼさない。
+    """
+    quantity = db.scalar(
+        update(InventoryItem)
+        .where(
+            InventoryItem.id == inventory_item.id,
+            InventoryItem.quantity_on_hand + delta >= 0,
+        )
+        .values(quantity_on_hand=InventoryItem.quantity_on_hand + delta)
+        .returning(InventoryItem.quantity_on_hand)
+        .execution_options(synchronize_session=False)
+    )
+    if quantity is None:
+        return False
+    # 応答の組み立てに使うため、読み込み済みのオブジェクトにも DB の値を反映する
+    set_committed_value(inventory_item, "quantity_on_hand", quantity)
+    return True
+
+
+def redirect_with_message(next_url: str, message: str) -> RedirectResponse:
+    """画面に表示するメッセージをクエリに付けて next_url へ戻す。"""
+    separator = '&' if '?' in next_url else '?'
+    return RedirectResponse(url=f"{next_url}{separator}message={quote_plus(message)}", status_code=303)
+
+
 @app.post('/inventory/issues')
 def inventory_issue(
     item_code: str = Form(...),
@@ -1933,16 +2552,14 @@ def inventory_issue(
 ) -> RedirectResponse:
     if quantity <= 0:
         raise HTTPException(status_code=400, detail="出庫数は1以上で指定してください。")
-    item = db.scalar(select(Item).filter(Item.item_code == item_code))
+    item, inventory_item = load_item_with_inventory(db, item_code)
     if not item:
         raise HTTPException(status_code=404, detail="対象品目が見つかりません。")
-    inventory_item = db.scalar(select(InventoryItem).filter(InventoryItem.item_id == item.id))
     if not inventory_item:
         raise HTTPException(status_code=400, detail="在庫情報が見つかりません。")
-    if inventory_item.quantity_on_hand < quantity:
+    if not apply_inventory_delta(db, inventory_item, -quantity):
         raise HTTPException(status_code=400, detail="在庫数が不足しています。")
 
-    inventory_item.quantity_on_hand -= quantity
     created_by_value = created_by or (
         str(current_user.get("username") or "system") if current_user else "system"
     )
@@ -1952,14 +2569,13 @@ def inventory_issue(
         delta=-quantity,
         reason=reason or "",
         note="",
-        occurred_at=datetime.now(JST_ZONE),
+        occurred_at=now_jst(),
         created_by=created_by_value,
     )
     db.add(tx)
-    db.commit()
-    separator = '&' if '?' in next_url else '?'
     message = f"{item.name} ({item.item_code}) を {quantity} 出庫しました。"
-    return RedirectResponse(url=f"{next_url}{separator}message={quote_plus(message)}", status_code=303)
+    db.commit()
+    return redirect_with_message(next_url, message)
 
 
 @app.post('/api/inventory/receipts', response_model=IssueRecordResponse)
@@ -1971,27 +2587,26 @@ def api_inventory_receipt(
     _ = current_user
     if payload.quantity <= 0:
         raise HTTPException(status_code=400, detail="数量は1以上で指定してください。")
-    item = db.scalar(select(Item).filter(Item.item_code == payload.item_code))
+    item, inventory_item = load_item_with_inventory(db, payload.item_code)
     if not item:
         raise HTTPException(status_code=404, detail="対象品目が見つかりません。")
-    inventory_item = db.scalar(select(InventoryItem).filter(InventoryItem.item_id == item.id))
     if not inventory_item:
         raise HTTPException(status_code=400, detail="在庫情報が見つかりません。")
 
-    inventory_item.quantity_on_hand += payload.quantity
+    apply_inventory_delta(db, inventory_item, payload.quantity)
     tx = InventoryTransaction(
         item_id=item.id,
         tx_type=TransactionType.RECEIPT,
         delta=payload.quantity,
         reason=payload.reason or "",
         note="",
-        occurred_at=datetime.now(JST_ZONE),
+        occurred_at=now_jst(),
         created_by=str(current_user.get("username") or "system"),
     )
     db.add(tx)
-    db.commit()
     response_data = build_inventory_status_payload(item, inventory_item, tx, db=db)
     response_data["message"] = f"{item.name} ({item.item_code}) を {payload.quantity} 入庫しました。"
+    db.commit()
     return IssueRecordResponse(**response_data)
 
 
@@ -2003,16 +2618,14 @@ def api_inventory_issue(
 ) -> IssueRecordResponse:
     if payload.quantity <= 0:
         raise HTTPException(status_code=400, detail="数量は1以上で指定してください。")
-    item = db.scalar(select(Item).filter(Item.item_code == payload.item_code))
+    item, inventory_item = load_item_with_inventory(db, payload.item_code)
     if not item:
         raise HTTPException(status_code=404, detail="対象品目が見つかりません。")
-    inventory_item = db.scalar(select(InventoryItem).filter(InventoryItem.item_id == item.id))
     if not inventory_item:
         raise HTTPException(status_code=400, detail="在庫情報が見つかりません。")
-    if inventory_item.quantity_on_hand < payload.quantity:
+    if not apply_inventory_delta(db, inventory_item, -payload.quantity):
         raise HTTPException(status_code=400, detail="在庫数が不足しています。")
 
-    inventory_item.quantity_on_hand -= payload.quantity
     created_by_value = str(current_user.get("username") or "system") if current_user else "system"
     tx = InventoryTransaction(
         item_id=item.id,
@@ -2020,13 +2633,13 @@ def api_inventory_issue(
         delta=-payload.quantity,
         reason=payload.reason or "",
         note="",
-        occurred_at=datetime.now(JST_ZONE),
+        occurred_at=now_jst(),
         created_by=created_by_value,
     )
     db.add(tx)
-    db.commit()
     response_data = build_inventory_status_payload(item, inventory_item, tx, db=db)
     response_data["message"] = f"{item.name} ({item.item_code}) を {payload.quantity} 出庫しました。"
+    db.commit()
     return IssueRecordResponse(**response_data)
 
 
@@ -2038,31 +2651,28 @@ def api_inventory_adjustment(
 ) -> IssueRecordResponse:
     if payload.delta == 0:
         raise HTTPException(status_code=400, detail="調整数は0以外で指定してください。")
-    item = db.scalar(select(Item).filter(Item.item_code == payload.item_code))
+    item, inventory_item = load_item_with_inventory(db, payload.item_code)
     if not item:
         raise HTTPException(status_code=404, detail="対象品目が見つかりません。")
-    inventory_item = db.scalar(select(InventoryItem).filter(InventoryItem.item_id == item.id))
     if not inventory_item:
         raise HTTPException(status_code=400, detail="在庫情報が見つかりません。")
 
-    after_quantity = (inventory_item.quantity_on_hand or 0) + payload.delta
-    if after_quantity < 0:
+    if not apply_inventory_delta(db, inventory_item, payload.delta):
         raise HTTPException(status_code=400, detail="調整後在庫が0未満になるため実行できません。")
 
-    inventory_item.quantity_on_hand = after_quantity
     tx = InventoryTransaction(
         item_id=item.id,
         tx_type=TransactionType.ADJUST,
         delta=payload.delta,
         reason=(payload.reason or "").strip() or "在庫調整",
         note="入出庫管理",
-        occurred_at=datetime.now(JST_ZONE),
+        occurred_at=now_jst(),
         created_by=str(current_user.get("username") or "system"),
     )
     db.add(tx)
-    db.commit()
     response_data = build_inventory_status_payload(item, inventory_item, tx, db=db)
     response_data["message"] = f"{item.name} ({item.item_code}) を {payload.delta:+d} 調整しました。"
+    db.commit()
     return IssueRecordResponse(**response_data)
 
 
@@ -2077,15 +2687,13 @@ def inventory_adjust(
     _ = current_user
     if delta == 0:
         raise HTTPException(status_code=400, detail="調整数量を指定してください。")
-    item = db.scalar(select(Item).filter(Item.item_code == item_code))
+    item, inventory_item = load_item_with_inventory(db, item_code)
     if not item:
         raise HTTPException(status_code=404, detail="対象品目が見つかりません。")
-    inventory_item = db.scalar(select(InventoryItem).filter(InventoryItem.item_id == item.id))
     if not inventory_item:
         raise HTTPException(status_code=400, detail="在庫情報が見つかりません。")
 
-    inventory_item.quantity_on_hand += delta
-    if inventory_item.quantity_on_hand < 0:
+    if not apply_inventory_delta(db, inventory_item, delta):
         raise HTTPException(status_code=400, detail="在庫数を0未満にはできません。")
 
     tx = InventoryTransaction(
@@ -2094,14 +2702,13 @@ def inventory_adjust(
         delta=delta,
         reason="在庫一括調整",
         note="管理画面更新",
-        occurred_at=datetime.now(JST_ZONE),
+        occurred_at=now_jst(),
         created_by="system",
     )
     db.add(tx)
-    db.commit()
-    separator = '&' if '?' in next_url else '?'
     message = f"{item.name} を {delta:+d} 調整しました。"
-    return RedirectResponse(url=f"{next_url}{separator}message={quote_plus(message)}", status_code=303)
+    db.commit()
+    return redirect_with_message(next_url, message)
 
 
 @app.post('/inventory/inline-adjust')
@@ -2112,49 +2719,62 @@ def inventory_inline_adjust(
 ) -> Dict[str, object]:
     if payload.target_quantity < 0:
         raise HTTPException(status_code=400, detail="在庫数量は0以上で指定してください。")
-    item = db.scalar(select(Item).filter(Item.item_code == payload.item_code))
+    item, inventory_item = load_item_with_inventory(db, payload.item_code)
     if not item:
         raise HTTPException(status_code=404, detail="指定された品目が見つかりません。")
-    inventory_item = db.scalar(select(InventoryItem).filter(InventoryItem.item_id == item.id))
     if not inventory_item:
         raise HTTPException(status_code=400, detail="在庫情報が未登録です。")
 
     before_quantity = inventory_item.quantity_on_hand or 0
-    inventory_item.quantity_on_hand = payload.target_quantity
     delta = payload.target_quantity - before_quantity
-    if delta != 0:
-        tx = InventoryTransaction(
-            item_id=item.id,
-            tx_type=TransactionType.ADJUST,
-            delta=delta,
-            reason="在庫一括更新",
-            note="一覧から更新",
-            occurred_at=datetime.now(JST_ZONE),
-            created_by="system",
-        )
-        db.add(tx)
-    db.commit()
+    if delta == 0:
+        # 数量が変わらない場合は書き込まず、表示用に既存の最新取引だけを取得する
+        last_tx = db.execute(
+            select(
+                InventoryTransaction.tx_type,
+                InventoryTransaction.note,
+                InventoryTransaction.reason,
+                InventoryTransaction.occurred_at,
+                InventoryTransaction.created_at,
+            )
+            .where(InventoryTransaction.item_id == item.id)
+            .order_by(InventoryTransaction.occurred_at.desc(), InventoryTransaction.id.desc())
+            .limit(1)
+        ).first()
+        return build_inventory_status_payload(item, inventory_item, last_tx, db=db)
 
-    last_tx_stmt = (
-        select(InventoryTransaction)
-        .filter(InventoryTransaction.item_id == item.id)
-        .order_by(InventoryTransaction.occurred_at.desc())
-        .limit(1)
+    inventory_item.quantity_on_hand = payload.target_quantity
+    tx = InventoryTransaction(
+        item_id=item.id,
+        tx_type=TransactionType.ADJUST,
+        delta=delta,
+        reason="在庫一括更新",
+        note="一覧から更新",
+        occurred_at=now_jst(),
+        created_by="system",
     )
-    last_tx = db.scalar(last_tx_stmt)
-    return build_inventory_status_payload(item, inventory_item, last_tx, db=db)
+    db.add(tx)
+    response_data = build_inventory_status_payload(item, inventory_item, tx, db=db)
+    db.commit()
+    return response_data
 
 
-def build_manage_sections(current_user: Dict[str, Any], active_key: str) -> List[Dict[str, object]]:
+def build_manage_sections(current_user: Dict[str, Any], active_key: str) -> Tuple[Dict[str, object], ...]:
+    """データ管理のタブ一覧。(管理者か, 表示中のタブ) ごとに共有するため、呼び出し側で変更しないこと。"""
+    return _build_manage_sections(is_admin_user(current_user), active_key)
+
+
+@functools.lru_cache(maxsize=16)
+def _build_manage_sections(is_admin: bool, active_key: str) -> Tuple[Dict[str, object], ...]:
     sections: List[Dict[str, object]] = [
         {"key": "suppliers", "label": "仕入先", "href": "/manage/suppliers"},
         {"key": "items", "label": "仕入品", "href": "/manage/items"},
     ]
-    if is_admin_user(current_user):
+    if is_admin:
         sections.append({"key": "email", "label": "メール設定", "href": "/manage/email-settings"})
     for section in sections:
         section["active"] = section["key"] == active_key
-    return sections
+    return tuple(sections)
 
 
 def serialize_items_for_manage(items: List[Item]) -> List[Dict[str, object]]:
@@ -2193,7 +2813,7 @@ def manage_data(
 @app.get('/manage/suppliers', response_class=HTMLResponse)
 def manage_suppliers(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     current_user: Dict[str, Any] = Depends(require_manager_user),
 ) -> HTMLResponse:
     suppliers = db.scalars(select(Supplier).order_by(Supplier.name.asc())).all()
@@ -2202,47 +2822,38 @@ def manage_suppliers(
         'nav_links': build_nav_links('/manage/suppliers', current_user),
         'manage_sections': build_manage_sections(current_user, 'suppliers'),
         'suppliers': suppliers,
-        'now': datetime.now(JST_ZONE),
+        'now': now_jst(),
         'current_user': current_user,
     }
     return templates.TemplateResponse('manage_suppliers.html', context)
 
 
+# (テンプレートに渡すキー, 品目の属性) の組
+_DISTINCT_ITEM_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("item_codes", "item_code"),
+    ("item_types", "item_type"),
+    ("usages", "usage"),
+    ("departments", "department"),
+    ("manufacturers", "manufacturer"),
+    ("shelves", "shelf"),
+)
+
+
 def _distinct_item_values(items: List[Item]) -> Dict[str, List[str]]:
     """仕入品一覧からカテゴリ・用途・部署・メーカー・棚番・品番の既存値リストを重複排除・ソートして返す。"""
-    codes: Set[str] = set()
-    types: Set[str] = set()
-    usages: Set[str] = set()
-    departments: Set[str] = set()
-    manufacturers: Set[str] = set()
-    shelves: Set[str] = set()
-    for item in items:
-        if item.item_code and item.item_code.strip():
-            codes.add(item.item_code.strip())
-        if item.item_type and item.item_type.strip():
-            types.add(item.item_type.strip())
-        if item.usage and item.usage.strip():
-            usages.add(item.usage.strip())
-        if item.department and item.department.strip():
-            departments.add(item.department.strip())
-        if item.manufacturer and item.manufacturer.strip():
-            manufacturers.add(item.manufacturer.strip())
-        if item.shelf and item.shelf.strip():
-            shelves.add(item.shelf.strip())
-    return {
-        "item_codes": sorted(codes),
-        "item_types": sorted(types),
-        "usages": sorted(usages),
-        "departments": sorted(departments),
-        "manufacturers": sorted(manufacturers),
-        "shelves": sorted(shelves),
-    }
+    distinct: Dict[str, List[str]] = {}
+    for key, attr in _DISTINCT_ITEM_FIELDS:
+        # 項目ごとに集合内包表記で1回ずつ走査する（行ごとの分岐を6回繰り返さない）
+        values = {value.strip() for value in map(attrgetter(attr), items) if value}
+        values.discard("")
+        distinct[key] = sorted(values)
+    return distinct
 
 
 @app.get('/manage/items', response_class=HTMLResponse)
 def manage_items(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     current_user: Dict[str, Any] = Depends(require_manager_user),
 ) -> HTMLResponse:
     suppliers = db.scalars(select(Supplier).order_by(Supplier.name.asc())).all()
@@ -2263,7 +2874,7 @@ def manage_items(
         'distinct_departments': distinct["departments"],
         'distinct_manufacturers': distinct["manufacturers"],
         'distinct_shelves': distinct["shelves"],
-        'now': datetime.now(JST_ZONE),
+        'now': now_jst(),
         'current_user': current_user,
     }
     return templates.TemplateResponse('manage_items.html', context)
@@ -2279,36 +2890,32 @@ def _purchaser_name_display(value: Optional[str]) -> str:
     return raw
 
 
-def _query_purchase_results_filtered(
-    db: Session,
+def _purchase_results_conditions(
     delivery_date_from: Optional[str] = None,
     delivery_date_to: Optional[str] = None,
     purchase_month: Optional[str] = None,
     supplier_id: Optional[int] = None,
     item_code: Optional[str] = None,
-):
-    stmt = (
-        select(PurchaseResult)
-        .options(selectinload(PurchaseResult.item), selectinload(PurchaseResult.supplier))
-        .order_by(PurchaseResult.delivery_date.desc().nulls_last(), PurchaseResult.id.desc())
-    )
+) -> List[Any]:
+    """購入実績の絞り込み条件。品番・品名の条件は Item を外部結合した文で使うこと。"""
+    conditions: List[Any] = []
     if delivery_date_from and delivery_date_from.strip():
         try:
-            stmt = stmt.where(PurchaseResult.delivery_date >= date.fromisoformat(delivery_date_from.strip()))
+            conditions.append(PurchaseResult.delivery_date >= date.fromisoformat(delivery_date_from.strip()))
         except ValueError:
             pass
     if delivery_date_to and delivery_date_to.strip():
         try:
-            stmt = stmt.where(PurchaseResult.delivery_date <= date.fromisoformat(delivery_date_to.strip()))
+            conditions.append(PurchaseResult.delivery_date <= date.fromisoformat(delivery_date_to.strip()))
         except ValueError:
             pass
     if purchase_month and purchase_month.strip() and len(purchase_month.strip()) == 4:
-        stmt = stmt.where(PurchaseResult.purchase_month == purchase_month.strip())
+        conditions.append(PurchaseResult.purchase_month == purchase_month.strip())
     if supplier_id is not None:
-        stmt = stmt.where(PurchaseResult.supplier_id == supplier_id)
+        conditions.append(PurchaseResult.supplier_id == supplier_id)
     if item_code and item_code.strip():
         pattern = f"%{item_code.strip()}%"
-        stmt = stmt.outerjoin(Item, PurchaseResult.item_id == Item.id).where(
+        conditions.append(
             or_(
                 and_(
                     PurchaseResult.item_id.isnot(None),
@@ -2317,7 +2924,41 @@ def _query_purchase_results_filtered(
                 and_(PurchaseResult.item_id.is_(None), PurchaseResult.item_name_free.ilike(pattern)),
             )
         )
-    return db.scalars(stmt).unique().all()
+    return conditions
+
+
+def _purchase_results_rows_stmt(
+    delivery_date_from: Optional[str] = None,
+    delivery_date_to: Optional[str] = None,
+    purchase_month: Optional[str] = None,
+    supplier_id: Optional[int] = None,
+    item_code: Optional[str] = None,
+) -> Any:
+    """購入実績の表示・出力に使う列だけを、仕入先・品目を外部結合して取得する文（ORM オブジェクトを作らない）。"""
+    return (
+        select(
+            PurchaseResult.id,
+            PurchaseResult.delivery_date,
+            PurchaseResult.supplier_id,
+            Supplier.name.label("supplier_name"),
+            PurchaseResult.delivery_note_number,
+            Item.item_code,
+            Item.name.label("item_name"),
+            PurchaseResult.item_name_free,
+            PurchaseResult.quantity,
+            PurchaseResult.unit_price,
+            PurchaseResult.amount,
+            PurchaseResult.purchase_month,
+            PurchaseResult.account_name,
+            PurchaseResult.expense_item_name,
+            PurchaseResult.purchaser_name,
+            PurchaseResult.note,
+        )
+        .outerjoin(Supplier, Supplier.id == PurchaseResult.supplier_id)
+        .outerjoin(Item, Item.id == PurchaseResult.item_id)
+        .where(*_purchase_results_conditions(delivery_date_from, delivery_date_to, purchase_month, supplier_id, item_code))
+        .order_by(PurchaseResult.delivery_date.desc().nulls_last(), PurchaseResult.id.desc())
+    )
 
 
 @app.get('/purchase-results', response_class=HTMLResponse)
@@ -2328,11 +2969,10 @@ def purchase_results_page(
     purchase_month: Optional[str] = Query(None),
     supplier_id: Optional[int] = Query(None),
     item_code: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     current_user: Dict[str, Any] = Depends(require_manager_user),
 ) -> HTMLResponse:
-    results = _query_purchase_results_filtered(
-        db,
+    stmt = _purchase_results_rows_stmt(
         delivery_date_from=delivery_date_from,
         delivery_date_to=delivery_date_to,
         purchase_month=purchase_month,
@@ -2341,15 +2981,16 @@ def purchase_results_page(
     )
     suppliers = db.scalars(select(Supplier).order_by(Supplier.name.asc())).all()
     rows: List[Dict[str, Any]] = []
-    for r in results:
+    for r in db.execute(stmt):
+        has_item = r.item_code is not None
         rows.append({
             "id": r.id,
             "delivery_date": r.delivery_date.isoformat() if r.delivery_date else "",
             "supplier_id": r.supplier_id,
-            "supplier_name": r.supplier.name if r.supplier else "",
+            "supplier_name": r.supplier_name or "",
             "delivery_note_number": r.delivery_note_number or "",
-            "item_code": r.item.item_code if r.item else "",
-            "item_name": (r.item.name if r.item else getattr(r, "item_name_free", None)) or "",
+            "item_code": r.item_code if has_item else "",
+            "item_name": (r.item_name if has_item else r.item_name_free) or "",
             "quantity": r.quantity,
             "unit_price": r.unit_price,
             "amount": r.amount,
@@ -2371,12 +3012,15 @@ def purchase_results_page(
             "supplier_id": supplier_id,
             "item_code": item_code or "",
         },
-        "now": datetime.now(JST_ZONE),
+        "now": now_jst(),
         "current_user": current_user,
     }
     return templates.TemplateResponse("purchase_results.html", context)
 
 
+PURCHASE_RESULTS_CSV_BATCH_SIZE = 1000
+
+
 @app.get('/purchase-results/csv')
 def purchase_results_csv(
     delivery_date_from: Optional[str] = Query(None),
@@ -2384,44 +3028,53 @@ def purchase_results_csv(
     purchase_month: Optional[str] = Query(None),
     supplier_id: Optional[int] = Query(None),
     item_code: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     current_user: Dict[str, Any] = Depends(require_manager_user),
 ) -> Response:
-    results = _query_purchase_results_filtered(
-        db,
+    stmt = _purchase_results_rows_stmt(
         delivery_date_from=delivery_date_from,
         delivery_date_to=delivery_date_to,
         purchase_month=purchase_month,
         supplier_id=supplier_id,
         item_code=item_code,
     )
-    import csv
-    import io
-    buf = io.StringIO()
-    writer = csv.writer(buf)
-    writer.writerow([
-        "納入日", "購入先", "伝票番号", "品番", "品名", "数量", "単価", "金額",
-        "購入月", "科目名", "費目名", "購入者", "備考",
-    ])
-    for r in results:
+
+    def generate_csv() -> Iterator[bytes]:
+        # 全件をメモリに載せず、一定件数ずつ読み込んで CSV に変換しながら送る
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        buf.write("\ufeff")  # Excel で文字化けしないよう BOM を付ける
         writer.writerow([
-            r.delivery_date.isoformat() if r.delivery_date else "",
-            r.supplier.name if r.supplier else "",
-            r.delivery_note_number or "",
-            r.item.item_code if r.item else "",
-            (r.item.name if r.item else getattr(r, "item_name_free", None)) or "",
-            r.quantity,
-            r.unit_price if r.unit_price is not None else "",
-            r.amount if r.amount is not None else "",
-            r.purchase_month or "",
-            r.account_name or "",
-            r.expense_item_name or "",
-            _purchaser_name_display(r.purchaser_name),
-            r.note or "",
+            "納入日", "購入先", "伝票番号", "品番", "品名", "数量", "単価", "金額",
+            "購入月", "科目名", "費目名", "購入者", "備考",
         ])
-    body = buf.getvalue()
-    return Response(
-        content=body.encode("utf-8-sig"),
+        for partition in db.execute(stmt.execution_options(yield_per=PURCHASE_RESULTS_CSV_BATCH_SIZE)).partitions():
+            for r in partition:
+                has_item = r.item_code is not None
+                writer.writerow([
+                    r.delivery_date.isoformat() if r.delivery_date else "",
+                    r.supplier_name or "",
+                    r.delivery_note_number or "",
+                    r.item_code if has_item else "",
+                    (r.item_name if has_item else r.item_name_free) or "",
+                    r.quantity,
+                    r.unit_price if r.unit_price is not None else "",
+                    r.amount if r.amount is not None else "",
+                    r.purchase_month or "",
+                    r.account_name or "",
+                    r.expense_item_name or "",
+                    _purchaser_name_display(r.purchaser_name),
+                    r.note or "",
+                ])
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate(0)
+        if buf.tell():
+            # 該当0件の場合はヘッダーのみ
+            yield buf.getvalue().encode("utf-8")
+
+    return StreamingResponse(
+        generate_csv(),
         media_type="text/csv; charset=utf-8",
         headers={"Content-Disposition": "attachment; filename=purchase_results.csv"},
     )
@@ -2512,7 +3165,7 @@ def manage_email_settings_page(
         'request': request,
         'nav_links': build_nav_links('/manage/suppliers', current_user),
         'manage_sections': build_manage_sections(current_user, 'email'),
-        'now': datetime.now(JST_ZONE),
+        'now': now_jst(),
         'current_user': current_user,
     }
     return templates.TemplateResponse('manage_email_settings.html', context)
@@ -2523,7 +3176,7 @@ def get_email_settings(
     current_user: Dict[str, Any] = Depends(require_admin_user),
 ) -> Dict[str, object]:
     _ = current_user
-    settings = normalize_email_settings(load_email_settings_config(EMAIL_SETTINGS_PATH))
+    settings = load_normalized_email_settings(EMAIL_SETTINGS_PATH)
     accounts = settings.get("accounts") if isinstance(settings.get("accounts"), dict) else {}
     password_registered: Dict[str, bool] = {}
     keyring_available = True
@@ -2539,9 +3192,7 @@ def get_email_settings(
             if isinstance(account, dict):
                 sender = str(account.get("sender") or "").strip()
             try:
-                password_registered[account_key] = bool(
-                    sender and keyring_module.get_password("purchase_order_app", sender)
-                )
+                password_registered[account_key] = bool(sender) and is_email_password_registered(keyring_module, sender)
             except Exception:
                 password_registered[account_key] = False
 
@@ -2599,7 +3250,7 @@ def set_email_account_password(
     if not password:
         raise HTTPException(status_code=400, detail='パスワードを入力してください。')
 
-    settings = normalize_email_settings(load_email_settings_config(EMAIL_SETTINGS_PATH))
+    settings = load_normalized_email_settings(EMAIL_SETTINGS_PATH)
     accounts = settings.get('accounts') if isinstance(settings.get('accounts'), dict) else {}
     account = accounts.get(normalized_key)
     if not isinstance(account, dict):
@@ -2616,6 +3267,7 @@ def set_email_account_password(
         keyring_module.set_password('purchase_order_app', sender, password)
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f'パスワード保存に失敗しました: {exc}') from exc
+    remember_email_password_registered(sender)
 
     return {'saved': True, 'account_key': normalized_key, 'sender': sender}
 
@@ -2628,10 +3280,8 @@ def orders_page(
     current_user: Dict[str, Any] = Depends(require_manager_user),
 ) -> HTMLResponse:
     selected_department = normalize_field(department)
-    snapshots = load_inventory_snapshots(db)
     order_contacts_all, order_contact_defaults, order_contacts_by_department = load_order_contacts(EMAIL_SETTINGS_PATH)
-    all_departments = get_all_departments_for_sidebar(snapshots, order_contacts_by_department)
-    sidebar_structure = build_sidebar_structure(snapshots, all_departments=all_departments)
+    _, sidebar_structure = load_sidebar(load_inventory_filter_index(db), order_contacts_by_department)
     # 部署ごとの発注を前提とするため、未選択時は先頭の部署へリダイレクト
     if not selected_department and sidebar_structure:
         first_dept = (sidebar_structure[0].get('name') or '').strip()
@@ -2695,7 +3345,7 @@ def orders_page(
         'purchase_order_statuses': [status.value for status in PurchaseOrderStatus],
         'order_contacts': order_contacts,
         'default_order_contact': order_contact_defaults.get(selected_department, ''),
-        'now': datetime.now(JST_ZONE),
+        'now': now_jst(),
         'current_user': current_user,
     }
     return templates.TemplateResponse('orders.html', context)
@@ -2715,7 +3365,7 @@ def order_request_page(
         'request': request,
         'nav_links': build_nav_links('/order-request', current_user),
         'request_departments': request_departments,
-        'now': datetime.now(JST_ZONE),
+        'now': now_jst(),
         'current_user': current_user,
     }
     return templates.TemplateResponse('order_request.html', context)
@@ -2878,7 +3528,7 @@ def update_purchase_order_status(
 @app.get('/history', response_class=HTMLResponse)
 def history_page(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     current_user: Optional[Dict[str, Any]] = Depends(get_optional_user),
 ) -> HTMLResponse:
     transactions = load_recent_transactions(db, limit=50)
@@ -2886,7 +3536,7 @@ def history_page(
         'request': request,
         'nav_links': build_nav_links('/history', current_user),
         'recent_transactions': transactions,
-        'now': datetime.now(JST_ZONE),
+        'now': now_jst(),
         'current_user': current_user,
     }
     return templates.TemplateResponse('history.html', context)
@@ -3099,7 +3749,7 @@ def update_item(
 @app.get('/api/items/{item_id}/can-delete')
 def can_delete_item(
     item_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     current_user: Dict[str, Any] = Depends(require_manager_user),
 ) -> Dict[str, object]:
     """削除可否を返す。発注明細・購入実績のいずれかに紐づいている場合は削除不可。"""
@@ -3180,7 +3830,7 @@ def delete_item(
 def search_items(
     q: str = Query('', alias='q'),
     limit: int = Query(20, ge=1, le=50),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     current_user: Dict[str, Any] = Depends(require_manager_user),
 ) -> Dict[str, List[Dict[str, object]]]:
     _ = current_user
@@ -3220,7 +3870,7 @@ def search_items(
 def search_items_for_request(
     q: str = Query('', alias='q'),
     limit: int = Query(20, ge=1, le=50),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     current_user: Dict[str, Any] = Depends(require_viewer_user),
 ) -> Dict[str, List[Dict[str, object]]]:
     """品番・品名で検索（管理外依頼フォームのオートコンプリート用。viewer 以上で利用可）"""
@@ -3258,7 +3908,7 @@ def create_unmanaged_order_request(
         except ValueError:
             pass
     if not requested_at:
-        requested_at = datetime.now(JST_ZONE).date()
+        requested_at = now_jst().date()
     if payload.quantity < 1:
         raise HTTPException(status_code=400, detail="注文数量は1以上で指定してください。")
     if not (payload.requested_department or "").strip():
@@ -3309,7 +3959,7 @@ def list_unmanaged_order_requests(
     status: Optional[str] = Query(None),
     all: bool = Query(False, alias="all"),
     exclude_acknowledged: bool = Query(True),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     current_user: Dict[str, Any] = Depends(require_viewer_user),
 ) -> Dict[str, object]:
     """管理外発注依頼一覧。viewer 以上で利用可。all=true で全ステータス。exclude_acknowledged=true で確認済みを除外。"""
@@ -3352,7 +4002,7 @@ def acknowledge_unmanaged_order_request(
             raise HTTPException(status_code=400, detail="入庫済・発注取消・却下の依頼のみリストから削除できます。")
     else:
         raise HTTPException(status_code=400, detail="入庫済・発注取消・却下の依頼のみリストから削除できます。")
-    req.acknowledged_at = datetime.now(JST_ZONE)
+    req.acknowledged_at = now_jst()
     db.commit()
     return {"message": "リストから削除しました。"}
 
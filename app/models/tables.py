@@ -8,6 +8,7 @@ from sqlalchemy import (
     Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -144,13 +145,22 @@ class InventoryItem(Base):
     item = relationship("Item", back_populates="inventory_item")
 
 
+JST_ZONE = ZoneInfo("Asia/Tokyo")
+
+
 def _jst_now() -> datetime:
     """在庫取引の発生時刻は JST で統一する（履歴の時系列整合のため）。"""
-    return datetime.now(ZoneInfo("Asia/Tokyo"))
+    return datetime.now(JST_ZONE)
 
 
 class InventoryTransaction(Base):
     __tablename__ = "inventory_transactions"
+    __table_args__ = (
+        # 当日分の件数集計（occurred_at の範囲指定）用
+        Index("ix_inventory_transactions_occurred_at", "occurred_at"),
+        # 品目ごとの最新取引（item_id で絞って occurred_at の降順）用
+        Index("ix_inventory_transactions_item_occurred_at", "item_id", "occurred_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     item_id = Column(ForeignKey("items.id"), nullable=False)
@@ -176,6 +186,8 @@ class PurchaseOrderStatus(str, Enum):
 
 class PurchaseOrder(Base):
     __tablename__ = "purchase_orders"
+    # 未完了ステータスでの絞り込み → 明細との結合を索引だけで進められるようにする
+    __table_args__ = (Index("ix_po_status_id", "status", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     supplier_id = Column(ForeignKey("suppliers.id"), nullable=False)
@@ -199,6 +211,11 @@ class PurchaseOrder(Base):
 
 class PurchaseOrderLine(Base):
     __tablename__ = "purchase_order_lines"
+    # 本日納期の件数（納期 = 当日）と品目ごとの発注状況（item_id IN ...）の検索用
+    __table_args__ = (
+        Index("ix_pol_due_po", "vendor_reply_due_date", "purchase_order_id"),
+        Index("ix_pol_item_id", "item_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     purchase_order_id = Column(ForeignKey("purchase_orders.id"), nullable=False)
@@ -267,6 +267,24 @@ class PurchaseOrderService:
             )
         return payload
 
+    def list_lines_by_order(self, order_ids: list[int]) -> dict[int, list[dict[str, Any]]]:
+        """指定した発注の明細を1回のクエリで取得し、発注IDごとに ID 順の表示用辞書（list_orders の lines と同じ形）で返す。"""
+        lines_by_order: dict[int, list[dict[str, Any]]] = {order_id: [] for order_id in order_ids}
+        if not order_ids:
+            return lines_by_order
+        stmt = (
+            select(PurchaseOrderLine, PurchaseOrder.supplier_id)
+            .join(PurchaseOrder, PurchaseOrder.id == PurchaseOrderLine.purchase_order_id)
+            .where(PurchaseOrderLine.purchase_order_id.in_(order_ids))
+            .options(
+                selectinload(PurchaseOrderLine.item).selectinload(Item.item_suppliers),
+            )
+            .order_by(PurchaseOrderLine.id.asc())
+        )
+        for line, supplier_id in self.db.execute(stmt):
+            lines_by_order[line.purchase_order_id].append(self._line_with_unit_price(line, supplier_id))
+        return lines_by_order
+
     def _line_with_unit_price(self, line: PurchaseOrderLine, supplier_id: Optional[int]) -> dict[str, Any]:
         """発注明細の表示用辞書に単価を付与（item_suppliers 優先、なければ item.unit_price）。管理外（item_id なし）も item_name_free で表示。"""
         unit_price: Optional[int] = None
@@ -309,17 +327,41 @@ class PurchaseOrderService:
 
         unmanaged_request_ids_in_order: list[int] = []  # 発注作成後に CONVERTED 更新するため
 
-        for raw in lines:
-            unmanaged_request_id = raw.get("unmanaged_request_id")
-            if unmanaged_request_id is not None:
-                # 管理外依頼から明細を組み立て（発注候補に追加済みのもののみ）
-                req = self.db.scalar(
+        # 明細が参照する管理外依頼・品目は、明細ごとに検索せず IN でまとめて取得する
+        request_ids = {int(raw["unmanaged_request_id"]) for raw in lines if raw.get("unmanaged_request_id") is not None}
+        requests_by_id: dict[int, UnmanagedOrderRequest] = {}
+        if request_ids:
+            requests_by_id = {
+                req.id: req
+                for req in self.db.scalars(
                     select(UnmanagedOrderRequest)
-                    .where(UnmanagedOrderRequest.id == int(unmanaged_request_id))
+                    .where(UnmanagedOrderRequest.id.in_(request_ids))
                     .where(UnmanagedOrderRequest.status == UnmanagedOrderRequestStatus.PENDING.value)
                     .where(UnmanagedOrderRequest.staged_supplier_id.isnot(None))
                     .options(selectinload(UnmanagedOrderRequest.item).selectinload(Item.item_suppliers))
                 )
+            }
+        item_ids = {
+            int(raw["item_id"])
+            for raw in lines
+            if raw.get("unmanaged_request_id") is None and raw.get("item_id") is not None and int(raw["item_id"]) != 0
+        }
+        items_by_id: dict[int, Item] = {}
+        if item_ids:
+            items_by_id = {
+                item.id: item
+                for item in self.db.scalars(
+                    select(Item)
+                    .where(Item.id.in_(item_ids))
+                    .options(selectinload(Item.supplier), selectinload(Item.item_suppliers))
+                )
+            }
+
+        for raw in lines:
+            unmanaged_request_id = raw.get("unmanaged_request_id")
+            if unmanaged_request_id is not None:
+                # 管理外依頼から明細を組み立て（発注候補に追加済みのもののみ）
+                req = requests_by_id.get(int(unmanaged_request_id))
                 if not req:
                     raise PurchaseOrderError(f"依頼 ID {unmanaged_request_id} は発注候補に追加されていないか、存在しません。")
                 quantity = int(raw.get("quantity") or req.quantity or 0)
@@ -390,11 +432,7 @@ class PurchaseOrderService:
 
             item: Optional[Item] = None
             if item_id is not None:
-                item = self.db.scalar(
-                    select(Item)
-                    .filter(Item.id == int(item_id))
-                    .options(selectinload(Item.supplier), selectinload(Item.item_suppliers))
-                )
+                item = items_by_id.get(int(item_id))
                 if not item:
                     raise PurchaseOrderError(f"品目ID {item_id} が存在しません。")
                 # 明細で仕入先を指定していればそれを使用。未指定時は品目の代表仕入先（未設定なら発注不可）
@@ -1325,6 +1363,8 @@ class PurchaseOrderService:
 
         processed_count = 0
         processed_lines: list[tuple[PurchaseOrderLine, int]] = []
+        # 1回の入庫計上で作る在庫取引は同じ発生時刻にする
+        received_at = datetime.now(JST_ZONE)
         for line in order.lines:
             ordered = int(line.quantity or 0)
             received = max(0, int(line.received_quantity or 0))
@@ -1365,7 +1405,7 @@ class PurchaseOrderService:
                         delta=incoming,
                         reason=f"発注#{order.id} 分納入庫",
                         note=f"発注管理 明細#{line.id}",
-                        occurred_at=datetime.now(JST_ZONE),
+                        occurred_at=received_at,
                         created_by=(updated_by or "").strip() or "system",
                     )
                 )
@@ -1499,6 +1539,7 @@ class PurchaseOrderService:
         return expected
 
     def _apply_receipt_inventory(self, order: PurchaseOrder, updated_by: str) -> None:
+        received_at = datetime.now(JST_ZONE)
         for line in order.lines:
             ordered = int(line.quantity or 0)
             received = max(0, int(line.received_quantity or 0))
@@ -1523,7 +1564,7 @@ class PurchaseOrderService:
                     delta=remaining,
                     reason=f"発注#{order.id} 納品計上",
                     note="発注管理",
-                    occurred_at=datetime.now(JST_ZONE),
+                    occurred_at=received_at,
                     created_by=(updated_by or "").strip() or "system",
                 )
             )
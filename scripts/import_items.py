@@ -118,6 +118,9 @@ def import_items(session: Session) -> None:
         reorder_point = safe_int(read_column(row, "発注点"))
         management_type_raw = read_column(row, "管理/管理外")
         management_type = management_type_raw if management_type_raw in ("管理", "管理外") else "管理"
+        if management_type == "管理外":
+            # 管理外は発注点を使わない（init_db の一括補正は起動ごとには走らないため取込時にそろえる）
+            reorder_point = 0
         stock_qty = safe_int(read_column(row, "在庫数"))
         supplier_name = read_column(row, "仕入先名")
         supplier = None